@@ -0,0 +1,267 @@
+"""
+Admission Control
+Starts a job only when its estimated peak memory fits next to the jobs already
+running. Estimates come from the probed media (duration, resolution) and the
+Whisper model, are compared against live RSS and a memory budget, and are
+corrected over time from the peaks actually measured.
+"""
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+
+MB = 1024 * 1024
+
+# Approximate resident size of each Whisper model on CPU (fp32 weights plus runtime)
+MODEL_MEMORY_MB = {
+    "tiny": 400,
+    "base": 550,
+    "small": 1200,
+    "medium": 3200,
+    "large": 6300,
+    "large-v2": 6300,
+    "large-v3": 6300,
+}
+DEFAULT_MODEL_MEMORY_MB = 6300
+
+# Whisper holds the decoded 16 kHz float32 audio plus its log-mel copy and padding
+AUDIO_BYTES_PER_SECOND = 16000 * 4 * 3
+# Decoder activations/KV cache as a fraction of model size
+DECODE_WORKING_SET = 0.25
+# libx264 (medium) buffers lookahead and reference frames; ~60 YUV420 frames plus fixed overhead
+FFMPEG_FRAMES_BUFFERED = 60
+FFMPEG_BASE_BYTES = 150 * MB
+
+SAMPLE_INTERVAL = 0.5
+
+# Model name for jobs that only re-render video (deferred translations): no Whisper
+# stage, and their correction factor is learned separately from transcription jobs
+RENDER_ONLY = "render-only"
+
+
+def _proc_rss_bytes(pid: str) -> int:
+    """VmRSS of one process from /proc, or 0 if it is gone."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return 0
+
+
+def _child_pids() -> List[str]:
+    """PIDs of this process's direct children (ffmpeg/ffprobe), from /proc."""
+    pids: List[str] = []
+    try:
+        for task in os.listdir("/proc/self/task"):
+            with open(f"/proc/self/task/{task}/children", encoding="ascii") as f:
+                pids.extend(f.read().split())
+        return pids
+    except OSError:
+        pass
+    # Kernels without task children files: scan every process for our pid as parent
+    parent = str(os.getpid())
+    try:
+        names = os.listdir("/proc")
+    except OSError:
+        return pids
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", encoding="ascii", errors="replace") as f:
+                # The command name may contain spaces; fields after its closing ')' are fixed
+                fields = f.read().rsplit(")", 1)[1].split()
+            if fields[1] == parent:
+                pids.append(name)
+        except (OSError, IndexError):
+            continue
+    return pids
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process plus its child processes (ffmpeg renders).
+
+    Reads Linux /proc; elsewhere falls back to this process's peak from getrusage.
+    """
+    own = _proc_rss_bytes("self")
+    if own:
+        return own + sum(_proc_rss_bytes(pid) for pid in _child_pids())
+    import resource
+    import sys
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def memory_budget_bytes() -> int:
+    """Memory budget: MEMORY_BUDGET_MB, else 85% of the cgroup limit, else 80% of physical RAM."""
+    configured = os.getenv("MEMORY_BUDGET_MB")
+    if configured:
+        return int(float(configured) * MB)
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        try:
+            with open(path, encoding="ascii") as f:
+                value = f.read().strip()
+            # cgroup v1 reports a huge number when unlimited
+            if value != "max" and int(value) < 1 << 60:
+                return int(int(value) * 0.85)
+        except (OSError, ValueError):
+            continue
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * 0.8)
+    except (ValueError, OSError, AttributeError):
+        return 16 * 1024 * MB
+
+
+class AdmissionTicket:
+    """A running job's memory reservation and the peak RSS (with children) observed while it ran."""
+
+    __slots__ = ("job_id", "model_name", "estimate", "raw_estimate", "start_rss", "peak_rss", "solo", "admitted_at")
+
+    def __init__(self, job_id: str, model_name: str, estimate: int, raw_estimate: int, start_rss: int, solo: bool):
+        self.job_id = job_id
+        self.model_name = model_name
+        self.estimate = estimate
+        self.raw_estimate = raw_estimate
+        self.start_rss = start_rss
+        self.peak_rss = start_rss
+        self.solo = solo
+        self.admitted_at = time.time()
+
+
+class AdmissionController:
+    """Admits jobs while committed memory plus the new job's estimate fits the budget.
+
+    Committed memory is the larger of live RSS and idle RSS plus the reservations of
+    running jobs, so a job that has not reached its peak yet still holds its share.
+    A job is always admitted when nothing else is running, so oversized jobs run alone
+    rather than wait forever.
+    """
+
+    def __init__(self, budget_bytes: Optional[int] = None, rss_fn: Callable[[], int] = current_rss_bytes):
+        self.budget_bytes = budget_bytes if budget_bytes is not None else memory_budget_bytes()
+        self.rss_fn = rss_fn
+        self.idle_rss = rss_fn()
+        self._running: List[AdmissionTicket] = []
+        self._waiting = 0
+        # Per-model correction factor (measured / estimated), learned from solo runs
+        self._factors: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._sampler: Optional[threading.Thread] = None
+
+    def estimate(self, model_name: str, duration: Optional[float], width: Optional[int] = None,
+                 height: Optional[int] = None, model_resident: bool = False) -> Dict[str, int]:
+        """Estimate a job's peak memory in bytes: {"raw": model-only estimate, "bytes": corrected}."""
+        model_bytes = MODEL_MEMORY_MB.get(model_name, DEFAULT_MODEL_MEMORY_MB) * MB
+        duration = duration or 600.0
+        # Stages run one after another, so the peak is the larger of transcription and rendering
+        whisper_peak = 0
+        if model_name != RENDER_ONLY:
+            whisper_peak = (0 if model_resident else model_bytes) + model_bytes * DECODE_WORKING_SET
+            whisper_peak += duration * AUDIO_BYTES_PER_SECOND
+        render_peak = 0
+        if width and height:
+            render_peak = width * height * 1.5 * FFMPEG_FRAMES_BUFFERED + FFMPEG_BASE_BYTES
+        raw = int(max(whisper_peak, render_peak))
+        factor = self._factors.get(model_name, 1.0)
+        return {"raw": raw, "bytes": int(raw * factor)}
+
+    def _committed(self) -> int:
+        reserved = self.idle_rss + sum(t.estimate for t in self._running)
+        return max(self.rss_fn(), reserved)
+
+    def admit(
+        self,
+        job_id: str,
+        model_name: str,
+        estimate: Dict[str, int],
+        cancel_token=None,
+        on_wait: Optional[Callable[[str], None]] = None,
+    ) -> AdmissionTicket:
+        """Block until the job fits the budget, calling on_wait(reason) while it waits."""
+        needed = estimate["bytes"]
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if cancel_token is not None:
+                        cancel_token.raise_if_cancelled()
+                    if not self._running:
+                        # Nothing to wait for; refresh the idle baseline while we are at it
+                        self.idle_rss = self.rss_fn()
+                    committed = self._committed()
+                    if not self._running or committed + needed <= self.budget_bytes:
+                        break
+                    if on_wait is not None:
+                        on_wait(
+                            f"⏳ Waiting for memory: this job needs ~{needed / MB / 1024:.1f} GB, "
+                            f"{max(0, self.budget_bytes - committed) / MB / 1024:.1f} GB of "
+                            f"{self.budget_bytes / MB / 1024:.1f} GB free ({len(self._running)} job(s) running)"
+                        )
+                    self._cond.wait(timeout=1.0)
+            finally:
+                self._waiting -= 1
+            ticket = AdmissionTicket(job_id, model_name, needed, estimate["raw"], self.rss_fn(), solo=not self._running)
+            for other in self._running:
+                other.solo = False
+            self._running.append(ticket)
+            self._ensure_sampler()
+        return ticket
+
+    def release(self, ticket: Optional[AdmissionTicket]) -> None:
+        """Free the job's reservation and learn from its measured peak."""
+        if ticket is None:
+            return
+        with self._cond:
+            if ticket in self._running:
+                self._running.remove(ticket)
+            # Only solo runs give a clean measurement of one job's memory
+            measured = ticket.peak_rss - ticket.start_rss
+            if ticket.solo and ticket.raw_estimate > 0 and measured > 0:
+                ratio = min(3.0, max(0.5, measured / ticket.raw_estimate))
+                previous = self._factors.get(ticket.model_name, 1.0)
+                self._factors[ticket.model_name] = round(0.7 * previous + 0.3 * ratio, 3)
+            self._cond.notify_all()
+
+    def _ensure_sampler(self) -> None:
+        if self._sampler is None or not self._sampler.is_alive():
+            self._sampler = threading.Thread(target=self._sample, name="admission-rss-sampler", daemon=True)
+            self._sampler.start()
+
+    def _sample(self) -> None:
+        while True:
+            rss = self.rss_fn()
+            with self._cond:
+                if not self._running:
+                    return
+                for ticket in self._running:
+                    ticket.peak_rss = max(ticket.peak_rss, rss)
+            time.sleep(SAMPLE_INTERVAL)
+
+    def snapshot(self) -> Dict[str, object]:
+        with self._cond:
+            return {
+                "budget_mb": round(self.budget_bytes / MB),
+                "rss_mb": round(self.rss_fn() / MB),
+                "idle_rss_mb": round(self.idle_rss / MB),
+                "running": [{"job": t.job_id, "estimate_mb": round(t.estimate / MB)} for t in self._running],
+                "waiting": self._waiting,
+                "correction_factors": dict(self._factors),
+            }
+
+
+_default_controller: Optional[AdmissionController] = None
+_default_lock = threading.Lock()
+
+
+def get_controller() -> AdmissionController:
+    """Return the process-wide admission controller (budget from MEMORY_BUDGET_MB or the cgroup limit)."""
+    global _default_controller
+    with _default_lock:
+        if _default_controller is None:
+            _default_controller = AdmissionController()
+        return _default_controller
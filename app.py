@@ -4,55 +4,116 @@ Transcribes Korean audio/video and creates bilingual subtitles using Whisper and
 Generates SRT file and video with burned-in subtitles.
 """
 
-# Monkey patch to fix Gradio schema generation bug
-# This MUST be done BEFORE importing gradio
-try:
-    from gradio_client import utils as client_utils
-    
-    # Patch get_type to handle boolean schemas
-    original_get_type = client_utils.get_type
-    
-    def patched_get_type(schema):
-        # Fix: Handle case where schema is a boolean (for additionalProperties)
-        if isinstance(schema, bool):
-            return "Any"
-        # Also check if schema is a dict before checking 'const' in it
-        if not isinstance(schema, dict):
-            return "Any"
-        return original_get_type(schema)
-    
-    client_utils.get_type = patched_get_type
-    
-    # Also patch _json_schema_to_python_type to handle additionalProperties boolean
-    original_json_schema_to_python_type = client_utils._json_schema_to_python_type
-    
-    def patched_json_schema_to_python_type(schema, defs=None):
-        # Handle case where additionalProperties is a boolean
-        if isinstance(schema, dict) and 'additionalProperties' in schema:
-            if isinstance(schema['additionalProperties'], bool):
-                # Convert boolean to dict format
-                schema = schema.copy()
-                schema['additionalProperties'] = {}
-        return original_json_schema_to_python_type(schema, defs)
-    
-    client_utils._json_schema_to_python_type = patched_json_schema_to_python_type
-except Exception as e:
-    import warnings
-    warnings.warn(f"Failed to patch Gradio schema bug: {e}")
-
-# Now import gradio AFTER patching
 import os
+import re
 import time
-import gradio as gr
+_APP_IMPORT_START = time.perf_counter()
 import tempfile
 import subprocess
-try:
-    import whisper
-    USE_WHISPER = True
-except ImportError:
-    USE_WHISPER = False
+import threading
+import collections
+import shutil
+import urllib.error
+import urllib.parse
+
+from warmup import import_timer, record_timing, whisper_available, get_whisper_model, is_model_loaded, start_warmup
+with import_timer("gradio"):
+    import gradio as gr
+
+from papago_translation import (
+    PapagoTranslator, DeferredTranslationQueue, segments_to_srt, timestamp_to_srt, is_translation_error,
+    get_breaker, get_usage_meter, key_label, plan_translation, seconds_until_reset,
+)
+from artifact_store import PARTIAL_SUFFIX, get_store, is_plain_name
+from admission import RENDER_ONLY, get_controller
+from segment_store import SegmentStore, format_ass_timestamps, segment_timestamps
+from job_queue import get_job_queue, validate_payload, QUEUED, DONE, FAILED
+from cancellation import (
+    CancelToken, JobCancelled, bind_whisper, cancel_session, finish_session_job, install_whisper_hooks,
+    start_session_job,
+)
+
+# Whisper (and torch) are imported lazily by warmup.get_whisper_model, off the startup path
+USE_WHISPER = whisper_available()
+WHISPER_MODEL = "large-v3"
+
+# Progressive video output: a fast low-res preview first, then the full-quality render
+PROGRESSIVE_RENDER = os.getenv("PROGRESSIVE_RENDER", "1") != "0"
+PREVIEW_MAX_HEIGHT = 360
+
+# ffmpeg limits: timeouts scale with media duration; only a short stderr tail is kept in memory
+FFMPEG_REALTIME_FACTOR = 8.0
+FFMPEG_OVERALL_TIMEOUT_MIN = 300.0
+FFMPEG_STALL_TIMEOUT_MIN = 120.0
+FFMPEG_UNKNOWN_DURATION_TIMEOUT = 4 * 3600.0
+FFMPEG_STDERR_TAIL_LINES = 200
+
+# How often Gradio sweeps its cache of served files (their max age is the artifact TTL)
+GRADIO_CACHE_SWEEP_INTERVAL = 900
+
+# Latest job of each browser session, for the "Refresh outputs" button
+_session_jobs: dict[str, str] = {}
+
+# Per-session tokens that let the UI skip the follow-up full-quality render
+_full_render_skips: dict[str, CancelToken] = {}
+
+# Gradio runs unload handlers whenever a session's heartbeat connection drops, which includes
+# a mobile browser suspending the page. Its client never reopens that heartbeat, so the job is
+# cancelled unless the session is seen again (any request carrying its session hash, such as a
+# button press or a new queue stream) within this grace period
+UNLOAD_GRACE_SECONDS = float(os.getenv("UNLOAD_GRACE_SECONDS", 5 * 60))
+HEARTBEAT_PATH = re.compile(r"/heartbeat/([^/]+)$")
+_session_last_seen: dict[str, float] = {}
+
+# Worker mode: jobs go to a shared queue and are processed by worker.py processes
+_job_queue = get_job_queue()
+JOB_POLL_INTERVAL = 1.0
+# Give up on a job that no worker claims for this long (e.g. every worker is down)
+JOB_QUEUE_WAIT_TIMEOUT = float(os.getenv("JOB_QUEUE_WAIT_TIMEOUT", 30 * 60))
+
+# Segments that failed during a Papago outage are re-translated here once it recovers
+_deferred_translations = DeferredTranslationQueue()
+
+
+def _patch_gradio_client_schema():
+    """Monkey patch to fix Gradio schema generation bug.
+
+    gradio_client looks these helpers up at call time (when the API info page is
+    built), so patching right before launch is enough and keeps it off the import path.
+    """
+    try:
+        from gradio_client import utils as client_utils
+        
+        # Patch get_type to handle boolean schemas
+        original_get_type = client_utils.get_type
+        
+        def patched_get_type(schema):
+            # Fix: Handle case where schema is a boolean (for additionalProperties)
+            if isinstance(schema, bool):
+                return "Any"
+            # Also check if schema is a dict before checking 'const' in it
+            if not isinstance(schema, dict):
+                return "Any"
+            return original_get_type(schema)
+        
+        client_utils.get_type = patched_get_type
+        
+        # Also patch _json_schema_to_python_type to handle additionalProperties boolean
+        original_json_schema_to_python_type = client_utils._json_schema_to_python_type
+        
+        def patched_json_schema_to_python_type(schema, defs=None):
+            # Handle case where additionalProperties is a boolean
+            if isinstance(schema, dict) and 'additionalProperties' in schema:
+                if isinstance(schema['additionalProperties'], bool):
+                    # Convert boolean to dict format
+                    schema = schema.copy()
+                    schema['additionalProperties'] = {}
+            return original_json_schema_to_python_type(schema, defs)
         
-from papago_translation import PapagoTranslator, segments_to_srt, timestamp_to_srt
+        client_utils._json_schema_to_python_type = patched_json_schema_to_python_type
+    except Exception as e:
+        import warnings
+        warnings.warn(f"Failed to patch Gradio schema bug: {e}")
 
 
 def _extract_file_path(file_obj) -> str | None:
@@ -98,9 +159,11 @@ def _format_eta(seconds_total: int) -> str:
 
 
 def on_upload_complete(file_obj):
-    """Return upload-complete message. Processing continues server-side even if tab closes."""
+    """Return upload-complete message. Processing continues server-side through short disconnects."""
     base = (
-        "✅ Upload complete. When you tap ‘Process’, processing runs on the server and will continue even if you leave the app."
+        f"✅ Upload complete. Processing runs on the server; if you switch apps it keeps going for "
+        f"{UNLOAD_GRACE_SECONDS / 60:.0f} minutes—tap 🔄 Refresh outputs when you're back. "
+        "Closing this tab or uploading a new file cancels it."
     )
     return base
 
@@ -151,23 +214,25 @@ def create_ass_subtitles(segments, translator, play_res_x: int | None = None, pl
         "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
     ]
     
-    for seg in segments:
-        start = seg["start"]
-        end = seg["end"]
+    # Format every timestamp in one batch (HH:MM:SS.cc) instead of per segment
+    timestamps = segment_timestamps(segments, "ass")
+    for i, seg in enumerate(segments):
+        start_ass = timestamps[2 * i]
+        end_ass = timestamps[2 * i + 1]
         text_ko = seg["text"].strip()
         text_en = translator.translate_ko_to_en(text_ko)
-        
-        # Format timestamps for ASS (HH:MM:SS.cc)
-        start_ass = timestamp_to_ass(start)
-        end_ass = timestamp_to_ass(end)
+        # Leave the English line out rather than burning an error message into the video
+        if is_translation_error(text_en):
+            text_en = ""
         
         # Korean line (above English) using unified spec; layer 1 to ensure it renders above English
         ko_colored = f"{{\\an2\\fs36\\c&H00FFFFFF&\\3c&H20202020&}}{text_ko}"
         ass_lines.append(f"Dialogue: 1,{start_ass},{end_ass},Korean,,0,0,160,,{ko_colored}")
         
         # English line (bottom) using unified spec; layer 0
-        en_colored = f"{{\\an2\\fs36\\c&H00FFFFFF&\\3c&H20202020&}}{text_en}"
-        ass_lines.append(f"Dialogue: 0,{start_ass},{end_ass},English,,0,0,120,,{en_colored}")
+        if text_en:
+            en_colored = f"{{\\an2\\fs36\\c&H00FFFFFF&\\3c&H20202020&}}{text_en}"
+            ass_lines.append(f"Dialogue: 0,{start_ass},{end_ass},English,,0,0,120,,{en_colored}")
         # Two line breaks between segments (empty line)
         ass_lines.append("")
     
@@ -176,38 +241,214 @@ def create_ass_subtitles(segments, translator, play_res_x: int | None = None, pl
 
 def timestamp_to_ass(seconds: float) -> str:
     """Convert seconds to ASS timestamp format (HH:MM:SS.cc)."""
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    s = int(seconds % 60)
-    cs = int((seconds * 100) % 100)  # centiseconds
-    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+    return format_ass_timestamps((seconds,))[0]
+
+
+def probe_video_size(video_path: str) -> tuple[int | None, int | None]:
+    """Return (width, height) of the first video stream using ffprobe, or (None, None)."""
+    try:
+        probe = subprocess.run(
+            [
+                'ffprobe','-v','error','-select_streams','v:0','-show_entries','stream=width,height','-of','csv=s=x:p=0',
+                video_path
+            ], capture_output=True, text=True, timeout=15
+        )
+        if probe.returncode == 0 and 'x' in probe.stdout.strip():
+            w_str, h_str = probe.stdout.strip().split('x')
+            return int(w_str), int(h_str)
+    except Exception:
+        pass
+    return None, None
 
 
-def burn_subtitles_to_video(video_path: str, segments: list, translator: PapagoTranslator, output_path: str):
-    """Burn subtitles into video using ffmpeg."""
-    # Create temporary ASS subtitle file with UTF-8 encoding
+def write_ass_file(video_path: str, segments: list, translator: PapagoTranslator, directory: str | None = None) -> str:
+    """Write the bilingual ASS subtitle file for video_path and return its path.
+
+    The file can be reused for several renders (preview and full quality) of the same job.
+    """
     # Use UTF-8 with BOM to ensure Korean characters display correctly
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.ass', delete=False, encoding='utf-8-sig') as f:
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.ass', delete=False, encoding='utf-8-sig', dir=directory) as f:
         # Probe video resolution to set PlayRes for pixel-accurate fontsize
-        try:
-            probe = subprocess.run(
-                [
-                    'ffprobe','-v','error','-select_streams','v:0','-show_entries','stream=width,height','-of','csv=s=x:p=0',
-                    video_path
-                ], capture_output=True, text=True, timeout=15
-            )
-            if probe.returncode == 0 and 'x' in probe.stdout.strip():
-                w_str, h_str = probe.stdout.strip().split('x')
-                play_w = int(w_str)
-                play_h = int(h_str)
-            else:
-                play_w = play_h = None
-        except Exception:
-            play_w = play_h = None
-
+        play_w, play_h = probe_video_size(video_path)
         ass_content = create_ass_subtitles(segments, translator, play_res_x=play_w, play_res_y=play_h)
         f.write(ass_content)
-        ass_file = f.name
+        return f.name
+
+
+class RenderCancelled(Exception):
+    """Raised when an ffmpeg render is cancelled before it finishes."""
+
+
+def ffmpeg_timeouts(duration: float | None) -> tuple[float, float]:
+    """Return (stall_timeout, overall_timeout) in seconds, scaled to the media duration.
+
+    Unknown durations get generous fixed limits; the stall timeout still catches hung encodes.
+    """
+    if not duration or duration <= 0:
+        return FFMPEG_STALL_TIMEOUT_MIN, FFMPEG_UNKNOWN_DURATION_TIMEOUT
+    stall = max(FFMPEG_STALL_TIMEOUT_MIN, duration * 0.05)
+    overall = max(FFMPEG_OVERALL_TIMEOUT_MIN, duration * FFMPEG_REALTIME_FACTOR)
+    return stall, overall
+
+
+class _FFmpegProgress:
+    """Collects `-progress pipe:1` key=value blocks and a bounded stderr tail from reader threads."""
+
+    def __init__(self):
+        self.out_time = 0.0
+        self.frame = 0
+        self.fps = 0.0
+        self.speed = ""
+        self.last_advance = time.monotonic()
+        self.updated = False
+        self.stderr_tail: collections.deque = collections.deque(maxlen=FFMPEG_STDERR_TAIL_LINES)
+        self._lock = threading.Lock()
+
+    def read_progress(self, stream) -> None:
+        block: dict[str, str] = {}
+        for line in stream:
+            key, sep, value = line.strip().partition('=')
+            if not sep:
+                continue
+            block[key] = value
+            if key != 'progress':
+                continue
+            # "progress=continue|end" closes a block
+            with self._lock:
+                # out_time_ms is in microseconds despite its name; prefer out_time_us when present
+                micros = block.get('out_time_us') or block.get('out_time_ms')
+                try:
+                    out_time = int(micros) / 1_000_000 if micros and micros != 'N/A' else self.out_time
+                except ValueError:
+                    out_time = self.out_time
+                if out_time > self.out_time:
+                    self.out_time = out_time
+                    self.last_advance = time.monotonic()
+                try:
+                    self.frame = int(block.get('frame', self.frame))
+                    self.fps = float(block.get('fps', self.fps))
+                except ValueError:
+                    pass
+                self.speed = block.get('speed', self.speed).strip()
+                self.updated = True
+            block = {}
+
+    def read_stderr(self, stream) -> None:
+        for line in stream:
+            self.stderr_tail.append(line.rstrip())
+
+    def take_update(self):
+        """Return (out_time, frame, fps, speed) if new progress arrived since the last call."""
+        with self._lock:
+            if not self.updated:
+                return None
+            self.updated = False
+            return self.out_time, self.frame, self.fps, self.speed
+
+
+def _run_ffmpeg(
+    cmd: list,
+    duration: float | None = None,
+    progress_callback=None,
+    cancel_event=None,
+    low_priority: bool = False,
+):
+    """Run ffmpeg with live `-progress` parsing.
+
+    - progress_callback(fraction, desc) receives encode progress (0..1) with frame and fps
+    - Stall and overall timeouts are derived from the media duration (see ffmpeg_timeouts)
+    - Only the last FFMPEG_STDERR_TAIL_LINES lines of stderr are kept, for error messages
+    - The process is killed when cancel_event is set (raises RenderCancelled)
+    """
+    cmd = [cmd[0], '-nostats', '-progress', 'pipe:1'] + list(cmd[1:])
+    stall_timeout, overall_timeout = ffmpeg_timeouts(duration)
+    state = _FFmpegProgress()
+    proc = subprocess.Popen(
+        cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, stdin=subprocess.DEVNULL,
+        text=True, encoding='utf-8', errors='replace',
+    )
+    if low_priority and hasattr(os, 'setpriority'):
+        # Lower CPU priority so follow-up renders yield to interactive jobs. Set from the parent:
+        # preexec_fn is unsafe in this multi-threaded process.
+        try:
+            os.setpriority(os.PRIO_PROCESS, proc.pid, 10)
+        except OSError:
+            pass
+    readers = [
+        threading.Thread(target=state.read_progress, args=(proc.stdout,), daemon=True),
+        threading.Thread(target=state.read_stderr, args=(proc.stderr,), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    # Cancel tokens kill the process themselves, even while this thread is busy elsewhere
+    if hasattr(cancel_event, 'register_process'):
+        cancel_event.register_process(proc)
+    started = time.monotonic()
+    try:
+        while True:
+            try:
+                returncode = proc.wait(timeout=0.5)
+                break
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel_event is not None and cancel_event.is_set():
+                raise RenderCancelled("FFmpeg render cancelled")
+            now = time.monotonic()
+            if now - started > overall_timeout:
+                raise Exception(f"FFmpeg timed out after {overall_timeout:.0f}s")
+            if now - state.last_advance > stall_timeout:
+                raise Exception(f"FFmpeg stalled: no progress for {stall_timeout:.0f}s")
+            update = state.take_update()
+            if update is not None and progress_callback is not None:
+                out_time, frame, fps, speed = update
+                fraction = min(1.0, out_time / duration) if duration else 0.0
+                try:
+                    progress_callback(fraction, desc=f"Encoding video {fraction * 100:.0f}% (frame {frame}, {fps:.0f} fps, {speed or '?'})")
+                except (AttributeError, IndexError, TypeError):
+                    pass
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        if hasattr(cancel_event, 'unregister_process'):
+            cancel_event.unregister_process(proc)
+        for reader in readers:
+            reader.join(timeout=2)
+    # A cancel token kills ffmpeg from the cancelling thread, so the loop can exit through wait()
+    if cancel_event is not None and cancel_event.is_set():
+        raise RenderCancelled("FFmpeg render cancelled")
+    if returncode != 0:
+        stderr_text = "\n".join(state.stderr_tail)
+        raise Exception(f"FFmpeg error (code {returncode}): {stderr_text}")
+
+
+def burn_subtitles_to_video(
+    video_path: str,
+    segments: list,
+    translator: PapagoTranslator,
+    output_path: str,
+    preview: bool = False,
+    ass_file: str | None = None,
+    cancel_event=None,
+    low_priority: bool = False,
+    progress_callback=None,
+    duration: float | None = None,
+):
+    """Burn subtitles into video using ffmpeg.
+
+    Args:
+        preview: Render a downscaled, `ultrafast` preview instead of the full-quality encode
+        ass_file: Pre-built ASS file to reuse (left in place); built and removed here if None
+        cancel_event: threading.Event or CancelToken that kills the encode when set (raises RenderCancelled)
+        low_priority: Run ffmpeg at a lower CPU priority
+        progress_callback: Called as progress_callback(fraction, desc=...) while encoding
+        duration: Media duration in seconds (probed if None); scales progress and timeouts
+    """
+    owns_ass_file = ass_file is None
+    if owns_ass_file:
+        # Create temporary ASS subtitle file next to the output (job directory)
+        ass_dir = os.path.dirname(os.path.abspath(output_path)) or None
+        ass_file = write_ass_file(video_path, segments, translator, ass_dir)
     
     try:
         # Use raw ASS path (no shell quoting needed for /tmp paths)
@@ -233,25 +474,41 @@ def burn_subtitles_to_video(video_path: str, segments: list, translator: PapagoT
             f"subtitles={ass_file_escaped}:charenc=UTF-8:force_style=FontName=NanumGothic"
         )
         
-        cmd = [
-            'ffmpeg',
-            '-i', video_path,
-            '-vf', subtitle_filter,
-            '-c:v', 'libx264',
-            '-preset', 'medium',
-            '-crf', '23',
-            '-c:a', 'aac',
-            '-b:a', '192k',
-            '-y',  # Overwrite output file
-            output_path
-        ]
+        if preview:
+            # Downscale before burning so libass renders fewer pixels; PlayRes keeps font sizes proportional
+            cmd = [
+                'ffmpeg',
+                '-i', video_path,
+                '-vf', f"scale=-2:'min({PREVIEW_MAX_HEIGHT},ih)',{subtitle_filter}",
+                '-c:v', 'libx264',
+                '-preset', 'ultrafast',
+                '-crf', '30',
+                '-c:a', 'aac',
+                '-b:a', '96k',
+                '-movflags', '+faststart',
+                '-y',  # Overwrite output file
+                output_path
+            ]
+        else:
+            cmd = [
+                'ffmpeg',
+                '-i', video_path,
+                '-vf', subtitle_filter,
+                '-c:v', 'libx264',
+                '-preset', 'medium',
+                '-crf', '23',
+                '-c:a', 'aac',
+                '-b:a', '192k',
+                '-y',  # Overwrite output file
+                output_path
+            ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-        if result.returncode != 0:
-            error_msg = f"FFmpeg error (code {result.returncode}): {result.stderr}"
-            if result.stdout:
-                error_msg += f"\nFFmpeg output: {result.stdout}"
-            raise Exception(error_msg)
+        if duration is None:
+            duration = get_media_duration_seconds(video_path)
+        _run_ffmpeg(
+            cmd, duration=duration, progress_callback=progress_callback,
+            cancel_event=cancel_event, low_priority=low_priority,
+        )
         
         # Verify output file exists and has content
         if not os.path.exists(output_path):
@@ -262,26 +519,331 @@ def burn_subtitles_to_video(video_path: str, segments: list, translator: PapagoT
         return output_path
     finally:
         # Clean up temporary ASS file
-        if os.path.exists(ass_file):
+        if owns_ass_file and os.path.exists(ass_file):
             os.unlink(ass_file)
 
 
+def write_srt_file(store, srt_file: str, srt_content: str) -> str:
+    """Save SRT atomically with UTF-8 encoding (no BOM) and Unix LF line endings."""
+    try:
+        # Normalize line endings to LF and ensure SRT blocks are separated by a single blank line
+        srt_norm = srt_content.replace("\r\n", "\n").replace("\r", "\n")
+        # Collapse triple blank lines to double, then ensure final double newline
+        while "\n\n\n" in srt_norm:
+            srt_norm = srt_norm.replace("\n\n\n", "\n\n")
+        if not srt_norm.endswith("\n\n"):
+            srt_norm = srt_norm.rstrip("\n") + "\n\n"
+        # Write with LF endings and UTF-8 (no BOM)
+        return store.write_text(srt_file, srt_norm, encoding='utf-8', newline='\n')
+    except Exception:
+        # Fallback to raw content if normalization fails
+        return store.write_text(srt_file, srt_content, encoding='utf-8')
+
+
+def schedule_deferred_translation(
+    store,
+    job_id: str,
+    segments: list,
+    translator: PapagoTranslator,
+    failed_indices: list[int],
+    srt_file: str,
+    source_path: str | None = None,
+    video_path: str | None = None,
+    video_is_preview: bool = False,
+    max_age: float | None = None,
+):
+    """Queue failed segments for re-translation; rewrite the SRT (and video) in place when done.
+
+    The job directory stays protected from eviction until the deferred pass finishes or gives up
+    (after max_age seconds, or the queue's default). The video re-render goes through admission
+    control like any other job, so it waits for memory instead of running on top of live jobs.
+    """
+    texts = {i: segments[i]["text"].strip() for i in failed_indices}
+    store.acquire(job_id)
+
+    def on_complete(_translations):
+        admission_ticket = None
+        try:
+            # Every line is now in the translator's cache, so regenerating costs no API calls
+            write_srt_file(store, srt_file, segments_to_srt(segments, translator))
+            if video_path and source_path and os.path.exists(source_path):
+                admission = get_controller()
+                width, height = probe_video_size(source_path)
+                estimate = admission.estimate(RENDER_ONLY, get_media_duration_seconds(source_path), width, height)
+                waits = []
+
+                def log_first_wait(reason):
+                    if not waits:
+                        print(f"{reason} ({job_id} re-render)")
+                        waits.append(reason)
+
+                admission_ticket = admission.admit(job_id, RENDER_ONLY, estimate, on_wait=log_first_wait)
+                with store.atomic_path(video_path) as tmp_video_path:
+                    burn_subtitles_to_video(
+                        source_path, segments, translator, tmp_video_path,
+                        preview=video_is_preview, low_priority=True,
+                    )
+            print(f"✅ Deferred translation regenerated outputs for {job_id}")
+        finally:
+            get_controller().release(admission_ticket)
+            store.release(job_id)
+
+    _deferred_translations.submit(
+        translator, texts, on_complete, on_abandon=lambda: store.release(job_id), max_age=max_age,
+    )
+
+
+def refresh_hint(job_id: str, srt_basename: str) -> str:
+    """How to get outputs that a deferred translation rewrites after the job has finished.
+
+    Gradio serves copies of returned files, so the UI never sees the rewritten originals.
+    """
+    return (
+        f'tap "🔄 Refresh outputs" later, or download /outputs/{job_id}/{srt_basename} '
+        "(keep this link if you close the page)."
+    )
+
+
+def latest_outputs(store, job_id: str) -> tuple[str | None, str | None]:
+    """Return the newest finished SRT and video in a job directory (full render preferred over preview)."""
+    try:
+        names = [n for n in os.listdir(store.job_dir(job_id)) if is_plain_name(n) and PARTIAL_SUFFIX not in n]
+    except (OSError, ValueError):
+        return None, None
+
+    def newest(candidates):
+        paths = [store.path(job_id, n) for n in candidates]
+        return max(paths, key=os.path.getmtime) if paths else None
+
+    srt = newest([n for n in names if n.startswith("subtitles_") and n.endswith(".srt")])
+    video = newest([n for n in names if n.startswith("subtitled_") and not n.startswith("subtitled_preview_") and n.endswith(".mp4")])
+    video = video or newest([n for n in names if n.startswith("subtitled_preview_") and n.endswith(".mp4")])
+    return srt, video
+
+
+def refresh_outputs(request: gr.Request):
+    """Re-read this session's job directory so files rewritten by a deferred translation are served.
+
+    Also picks up results of a job that finished while the page was in the background.
+    """
+    if request is not None:
+        mark_session_seen(request.session_hash)
+    job_id = _session_jobs.get(request.session_hash) if request is not None else None
+    srt, video = latest_outputs(get_store(), job_id) if job_id else (None, None)
+    if srt is None:
+        gr.Info("No finished outputs for this session yet.")
+        return gr.update(), gr.update()
+    return gr.update(value=srt), (gr.update(value=video) if video else gr.update())
+
+
+def _scaled_progress(progress, start: float, end: float, label: str):
+    """Map a 0..1 stage progress callback onto the [start, end] slice of the job's progress bar."""
+    def callback(fraction: float, desc: str = ""):
+        progress(start + (end - start) * fraction, desc=f"{label}: {desc}")
+    return callback
+
+
+def skip_full_render(request: gr.Request):
+    """Cancel the pending full-quality render for this session, keeping the preview."""
+    if request is not None:
+        mark_session_seen(request.session_hash)
+    if _job_queue is not None:
+        gr.Info("Keep preview isn't available while jobs run on workers; the full-quality video will follow.")
+        return
+    render_token = _full_render_skips.get(request.session_hash) if request is not None else None
+    if render_token is not None:
+        render_token.cancel("full-quality render skipped")
+        gr.Info("Skipping full-quality render — the preview is your final video.")
+
+
+def serialize_outputs(outputs, store) -> dict:
+    """Convert a pipeline yield into JSON for the job queue; file paths become store-relative."""
+    srt_update, video_update, korean_text, english_text = outputs
+
+    def file_entry(update):
+        if update is None:
+            return None
+        value, label = (update.get("value"), update.get("label")) if isinstance(update, dict) else (update, None)
+        if value:
+            value = os.path.relpath(value, store.root)
+        return {"value": value, "label": label}
+
+    return {
+        "srt": file_entry(srt_update),
+        "video": file_entry(video_update),
+        "korean_text": korean_text,
+        "english_text": english_text,
+    }
+
+
+def deserialize_outputs(result: dict, store):
+    """Inverse of serialize_outputs, resolving paths against this host's artifact root."""
+    def to_update(entry):
+        if entry is None:
+            return None
+        value = os.path.join(store.root, entry["value"]) if entry.get("value") else None
+        return gr.update(value=value, label=entry["label"]) if entry.get("label") else value
+
+    return (
+        to_update(result.get("srt")),
+        to_update(result.get("video")),
+        result.get("korean_text"),
+        result.get("english_text"),
+    )
+
+
+def submit_and_track_job(job_queue, audio_file, url_input: str | None, progress, session_id: str | None = None):
+    """Worker mode: hand the job to the shared queue and stream its results back to the UI.
+
+    Uploads are copied into the shared artifact store so a worker on any host can read them.
+    The job is tracked as the session's current job, so a new job from the session or
+    closing the tab cancels it on the queue, which stops its worker.
+    """
+    if audio_file is None and not url_input:
+        yield None, None, "Please upload an audio or video file or provide a URL.", None
+        return
+    
+    if audio_file is None:
+        payload = {"url": url_input}
+    else:
+        source_path = _extract_file_path(audio_file)
+        payload = {"media": "input" + os.path.splitext(source_path)[1].lower()}
+    try:
+        # Same check the queue applies on submit, done before creating a job directory
+        validate_payload("job", payload)
+    except ValueError:
+        yield None, None, "Please provide an http:// or https:// URL.", None
+        return
+    
+    store = get_store()
+    job_id = store.new_job()
+    token = start_session_job(session_id)
+    if session_id:
+        _session_jobs[session_id] = job_id
+    try:
+        if "media" in payload:
+            with store.atomic_path(store.path(job_id, payload["media"])) as tmp_path:
+                shutil.copyfile(source_path, tmp_path)
+        try:
+            job_queue.submit(job_id, payload)
+        except (ValueError, urllib.error.URLError) as e:
+            print(f"❌ Job queue refused {job_id}: {e}")
+            store.remove(job_id)
+            yield None, None, f"Error: could not submit the job to the job queue ({e}).", None
+            return
+        token.on_cancel(lambda reason: _cancel_queued_job(job_queue, job_id, reason))
+        
+        last_result = None
+        queued_since = None
+        unreachable_since = None
+        while True:
+            if token.cancelled:
+                # Superseded or closed; like an in-process job, a cancelled job yields nothing more
+                return
+            try:
+                job = job_queue.get(job_id)
+            except urllib.error.URLError as e:
+                # Ride out a short coordinator outage; the job keeps running on its worker
+                unreachable_since = unreachable_since or time.monotonic()
+                if time.monotonic() - unreachable_since > JOB_QUEUE_WAIT_TIMEOUT:
+                    yield None, None, f"Error: lost contact with the job queue ({e}).", None
+                    return
+                progress(0.02, desc="⚠️ Job queue unreachable, retrying...")
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+            unreachable_since = None
+            if job is None:
+                yield None, None, "Error: job was lost by the job queue.", None
+                return
+            if job["status"] == QUEUED:
+                # get() requeues jobs whose worker died, so this also covers lost workers
+                queued_since = queued_since or time.monotonic()
+                if time.monotonic() - queued_since > JOB_QUEUE_WAIT_TIMEOUT:
+                    if job_queue.abandon(job_id, "No worker picked up the job; please try again later."):
+                        continue
+                progress(0.02, desc="⏳ Waiting for a free worker...")
+            else:
+                queued_since = None
+                progress(job["progress"] or 0.0, desc=job["desc"] or "Processing on worker...")
+            if job["result"] and job["result"] != last_result:
+                last_result = job["result"]
+                yield deserialize_outputs(last_result, store)
+            if job["status"] == FAILED:
+                srt_update, video_update, korean_text, english_text = (
+                    deserialize_outputs(last_result, store) if last_result else (None, None, None, None)
+                )
+                error_msg = f"Error: {job['error']}"
+                yield srt_update, video_update, korean_text or error_msg, f"{english_text}\n\n{error_msg}" if english_text else None
+                return
+            if job["status"] == DONE:
+                return
+            time.sleep(JOB_POLL_INTERVAL)
+    except GeneratorExit:
+        # The consumer stopped iterating (client gone); stop the worker too
+        token.cancel("job abandoned")
+        raise
+    finally:
+        finish_session_job(session_id, token)
+        store.release(job_id)
+
+
+def _cancel_queued_job(job_queue, job_id: str, reason: str | None) -> None:
+    try:
+        if job_queue.cancel(job_id, f"Cancelled: {reason or 'cancelled'}"):
+            print(f"🛑 Cancelled worker job {job_id} ({reason})")
+    except (ValueError, urllib.error.URLError) as e:
+        print(f"⚠️ Could not cancel worker job {job_id}: {e}")
+
+
 def transcribe_and_translate(
     audio_file,
     url_input: str | None = None,
+    request: gr.Request = None,
     progress=gr.Progress()
 ):
     """
     Transcribe Korean audio and create bilingual subtitles.
     Also generates video with burned-in subtitles.
     
+    In worker mode (JOB_QUEUE_URL or JOB_QUEUE_DB set) the job runs on a worker
+    process and this only submits it and tracks its progress.
+    
     Args:
         audio_file: Uploaded audio/video file
+        request: Gradio request, used to key per-session controls (skip full render)
         progress: Gradio progress tracker
         
     Returns:
         Tuple of (SRT file, video with subtitles, Korean text, English text, SRT ETA text, Video ETA text)
     """
+    if _job_queue is not None:
+        yield from submit_and_track_job(
+            _job_queue, audio_file, url_input, progress, session_id=getattr(request, 'session_hash', None),
+        )
+    else:
+        yield from run_pipeline(audio_file, url_input, request=request, progress=progress)
+
+
+def run_pipeline(
+    audio_file,
+    url_input: str | None = None,
+    request=None,
+    progress=None,
+    job_id: str | None = None,
+    cancel_token: CancelToken | None = None,
+):
+    """Run every stage of the job in this process (the body of transcribe_and_translate).
+    
+    The job is cancelled cooperatively (between Whisper windows and translation calls,
+    with ffmpeg killed) when the same session starts a new job, the tab is closed, or
+    cancel_token is cancelled. A cancelled job yields nothing more and frees its files.
+    
+    Args:
+        job_id: Existing artifact-store job to write into (used by workers); a new one if None
+        cancel_token: Token to cancel the job from outside (used by workers)
+    """
+    if progress is None:
+        progress = lambda *args, **kwargs: None
     if audio_file is None and not url_input:
         yield None, None, "Please upload an audio or video file or provide a URL.", None
         return
@@ -294,6 +856,20 @@ def transcribe_and_translate(
         yield None, None, "Error: Papago API credentials not found in Space secrets. Please add PAPAGO_CLIENT_ID and PAPAGO_CLIENT_SECRET in Settings → Secrets.", None
         return
     
+    # Every job writes into its own directory; it stays protected from eviction until the job ends
+    store = get_store()
+    owns_job_dir = job_id is None
+    if owns_job_dir:
+        job_id = store.new_job()
+    else:
+        store.acquire(job_id)
+    # A new job from the same browser session supersedes (cancels) the previous one
+    session_id = getattr(request, 'session_hash', None)
+    token = start_session_job(session_id, cancel_token)
+    if session_id:
+        _session_jobs[session_id] = job_id
+    cancelled = False
+    admission_ticket = None
     try:
         # Handle Gradio File object
         if audio_file is None and not url_input:
@@ -315,11 +891,20 @@ def transcribe_and_translate(
             # Download from URL to temp file on server (faster than mobile upload)
             try:
                 import urllib.request
+                import urllib.parse
+                # Only web URLs; urllib would also open file:// and other local schemes
+                if urllib.parse.urlparse(url_input).scheme.lower() not in ("http", "https"):
+                    yield None, None, "Please provide an http:// or https:// URL.", None
+                    return
                 progress(0.08, desc="Fetching media from URL on server...")
-                tmp_dir = tempfile.gettempdir()
-                url_fname = f"download_{int(time.time())}.bin"
-                audio_path = os.path.join(tmp_dir, url_fname)
-                urllib.request.urlretrieve(url_input, audio_path)
+                # Keep the URL's extension so video inputs are still detected as video
+                url_ext = os.path.splitext(urllib.parse.urlparse(url_input).path)[1].lower() or ".bin"
+                audio_path = store.path(job_id, f"download{url_ext}")
+                with store.atomic_path(audio_path) as tmp_path:
+                    # The report hook runs per downloaded block, so cancellation stops the download
+                    urllib.request.urlretrieve(url_input, tmp_path, reporthook=lambda *_: token.raise_if_cancelled())
+            except JobCancelled:
+                raise
             except Exception as e:
                 yield None, None, f"Failed to download from URL: {e}", None
                 return
@@ -336,20 +921,38 @@ def transcribe_and_translate(
         vid_duration = get_media_duration_seconds(audio_path) if is_video else None
 
         # Use best Whisper model automatically (large-v3)
-        whisper_model = "large-v3"
+        whisper_model = WHISPER_MODEL
+        
+        # Start only when this job's estimated peak memory fits next to the running jobs
+        media_duration = vid_duration if is_video else get_media_duration_seconds(audio_path)
+        width, height = probe_video_size(audio_path) if is_video else (None, None)
+        admission = get_controller()
+        estimate = admission.estimate(
+            whisper_model, media_duration, width, height, model_resident=is_model_loaded(whisper_model),
+        )
+        admission_ticket = admission.admit(
+            job_id, whisper_model, estimate, cancel_token=token,
+            on_wait=lambda reason: progress(0.09, desc=reason),
+        )
         
-        # Load Whisper model
+        # Load Whisper model (already resident once the background warm-up has finished)
         progress(0.1, desc="Loading Whisper model (large-v3)...")
         if USE_WHISPER:
-            model = whisper.load_model(whisper_model)
+            model = get_whisper_model(whisper_model)
+            token.raise_if_cancelled()
+            # Check for cancellation (and report progress) after every 30 s decoding window
+            install_whisper_hooks()
             # Transcribe audio
             progress(0.3, desc="Transcribing audio...")
-            result = model.transcribe(
-                audio_path,
-                language="ko",
-                task="transcribe"
-            )
-            segments = result["segments"]
+            with bind_whisper(token, on_progress=lambda f: progress(0.3 + 0.2 * f, desc=f"Transcribing audio... {f * 100:.0f}%")):
+                result = model.transcribe(
+                    audio_path,
+                    language="ko",
+                    task="transcribe"
+                )
+            # Keep only start/end/text; Whisper's token lists and log-probs are dropped right away
+            segments = SegmentStore.from_whisper(result["segments"])
+            del result
         else:
             yield None, None, "Error: Whisper package not installed.", None
             return
@@ -362,35 +965,68 @@ def transcribe_and_translate(
         progress(0.5, desc="Initializing translator...")
         translator = PapagoTranslator(papago_client_id, papago_client_secret)
         
+        # Korean text for the preview (translated in full below)
+        korean_text = segments.joined_text("\n")
+        
+        # Stable SRT filename; deferred translation rewrites this file in place
+        srt_basename = f"subtitles_{int(time.time())}.srt"
+        srt_file = store.path(job_id, srt_basename)
+        
+        # Pre-flight: jobs that do not fit today's Papago character budget are not translated now
+        plan = plan_translation(translator, [*segments.texts, korean_text])
+        quota_notice = None
+        deferred_max_age = None
+        if plan["decision"] == "defer":
+            # Korean-only outputs now; the deferred pass translates once the daily budget resets
+            translator.hold_until = time.time() + seconds_until_reset()
+            deferred_max_age = seconds_until_reset() + 6 * 3600
+            quota_notice = (
+                f"⏳ This job needs ~{plan['chars']:,} Papago characters but only {plan['remaining']:,} are left today. "
+                "Subtitles are Korean-only for now; English will be filled in automatically after the daily quota resets — "
+                f"{refresh_hint(job_id, srt_basename)}"
+            )
+        elif plan["decision"] == "reject":
+            translator.hold_until = float("inf")
+            quota_notice = (
+                f"❌ Translation rejected: this job needs ~{plan['chars']:,} Papago characters, more than the daily limit of "
+                f"{translator.meter.daily_limit:,}. Only Korean subtitles were created; split the media into shorter parts to translate it."
+            )
+        if quota_notice:
+            print(f"💳 Papago pre-flight for {job_id}: {plan}")
+        
         # Generate bilingual SRT with progress tracking
         progress(0.6, desc=f"Translating {len(segments)} segments...")
-        srt_content = segments_to_srt(segments, translator, show_progress=False, progress_callback=progress)
-        
-        # Extract Korean and English text for preview
-        korean_text = "\n".join([seg["text"].strip() for seg in segments])
+        # Segments that fail (e.g. Papago outage, circuit open) are written Korean-only and retried later
+        failed_indices: list[int] = []
+        srt_content = segments_to_srt(
+            segments, translator, show_progress=False, progress_callback=progress,
+            failed_indices=failed_indices, cancel_token=token,
+        )
         
         # Translate full text for preview
+        token.raise_if_cancelled()
         progress(0.7, desc="Generating English translation preview...")
         english_text = translator.translate_ko_to_en(korean_text)
+        if quota_notice:
+            english_text = quota_notice
+        elif failed_indices and getattr(translator, "quota_limited", False):
+            # Other jobs spent the budget after pre-flight; keep retrying past the daily reset
+            deferred_max_age = seconds_until_reset() + 6 * 3600
+            notice = (
+                f"⏳ The daily Papago character quota ran out: {len(failed_indices)} of {len(segments)} segments are "
+                f"Korean-only for now. English will be filled in automatically after the quota resets — "
+                f"{refresh_hint(job_id, srt_basename)}"
+            )
+            english_text = notice if is_translation_error(english_text) else f"{notice}\n\n{english_text}"
+        elif failed_indices:
+            notice = (
+                f"⚠️ Papago is unavailable: {len(failed_indices)} of {len(segments)} segments are Korean-only for now. "
+                f"English will be filled in automatically when the service recovers — {refresh_hint(job_id, srt_basename)}"
+            )
+            english_text = notice if is_translation_error(english_text) else f"{notice}\n\n{english_text}"
         
-        # Save SRT with a stable filename, UTF-8 encoding (no BOM), and Unix LF line endings
-        srt_basename = f"subtitles_{int(time.time())}.srt"
-        srt_file = os.path.join(tempfile.gettempdir(), srt_basename)
-        try:
-            # Normalize line endings to LF and ensure SRT blocks are separated by a single blank line
-            srt_norm = srt_content.replace("\r\n", "\n").replace("\r", "\n")
-            # Collapse triple blank lines to double, then ensure final double newline
-            while "\n\n\n" in srt_norm:
-                srt_norm = srt_norm.replace("\n\n\n", "\n\n")
-            if not srt_norm.endswith("\n\n"):
-                srt_norm = srt_norm.rstrip("\n") + "\n\n"
-            # Write with LF endings and UTF-8 (no BOM)
-            with open(srt_file, 'w', encoding='utf-8', newline='\n') as f:
-                f.write(srt_norm)
-        except Exception:
-            # Fallback to raw content if normalization fails
-            with open(srt_file, 'w', encoding='utf-8') as f:
-                f.write(srt_content)
+        # Save SRT with UTF-8 encoding (no BOM) and Unix LF line endings
+        write_srt_file(store, srt_file, srt_content)
         
         # Yield SRT immediately so user can download it (don't wait for video)
         srt_label_ready = "📄 SRT Subtitle File (for CapCut) ✅ Ready"
@@ -404,19 +1040,56 @@ def transcribe_and_translate(
         # Generate video with burned-in subtitles if input is video
         video_output = None
         video_error = None
+        video_is_preview = False
         if is_video:
             progress(0.8, desc=f"Burning subtitles into video...")
-            # Use a more accessible temp directory for video output
-            temp_dir = tempfile.gettempdir()
-            video_output_path = os.path.join(temp_dir, f"subtitled_{int(time.time())}.mp4")
+            render_ts = int(time.time())
+            video_output_path = store.path(job_id, f"subtitled_{render_ts}.mp4")
+            ass_file = None
+            # Skipping the full render cancels only this child token; cancelling the job cancels both
+            render_token = token.child()
+            if session_id:
+                _full_render_skips[session_id] = render_token
             
             try:
                 # Verify input video exists
                 if not os.path.exists(audio_path):
                     raise Exception(f"Input video file not found: {audio_path}")
                 
+                token.raise_if_cancelled()
                 progress(0.82, desc="Creating subtitle file...")
-                burn_subtitles_to_video(audio_path, segments, translator, video_output_path)
+                # Build the ASS file once and share it between the preview and full renders
+                ass_file = write_ass_file(audio_path, segments, translator, store.job_dir(job_id))
+                
+                if PROGRESSIVE_RENDER:
+                    progress(0.84, desc="Rendering fast preview...")
+                    preview_path = store.path(job_id, f"subtitled_preview_{render_ts}.mp4")
+                    with store.atomic_path(preview_path) as tmp_preview_path:
+                        burn_subtitles_to_video(
+                            audio_path, segments, translator, tmp_preview_path, preview=True, ass_file=ass_file,
+                            cancel_event=token,
+                            progress_callback=_scaled_progress(progress, 0.84, 0.88, "Preview"), duration=vid_duration,
+                        )
+                    video_output = preview_path
+                    video_is_preview = True
+                    # Show the preview right away; the full render follows at lower priority
+                    yield (
+                        gr.update(value=srt_file, label=srt_label_ready),
+                        gr.update(value=preview_path, label="🎬 Video with Burned-in Subtitles (Korean + English) ⚡ Preview — full quality rendering..."),
+                        korean_text,
+                        english_text,
+                    )
+                
+                full_start = 0.88 if PROGRESSIVE_RENDER else 0.84
+                progress(full_start, desc="Rendering full-quality video...")
+                # Render to a partial file and rename, so the player never sees a half-written video
+                with store.atomic_path(video_output_path) as tmp_video_path:
+                    burn_subtitles_to_video(
+                        audio_path, segments, translator, tmp_video_path,
+                        ass_file=ass_file, cancel_event=render_token, low_priority=PROGRESSIVE_RENDER,
+                        progress_callback=_scaled_progress(progress, full_start, 0.95, "Full quality"),
+                        duration=vid_duration,
+                    )
                 
                 # Verify output
                 if not os.path.exists(video_output_path):
@@ -427,8 +1100,15 @@ def transcribe_and_translate(
                     raise Exception(f"Video output file is empty (0 bytes): {video_output_path}")
                 
                 video_output = video_output_path
+                video_is_preview = False
                 progress(0.95, desc=f"✅ Video created successfully! ({video_size / 1024 / 1024:.1f} MB)")
                 
+            except RenderCancelled:
+                if token.cancelled:
+                    raise JobCancelled(token.reason)
+                progress(0.95, desc="⏭️ Full-quality render skipped; keeping the preview")
+            except JobCancelled:
+                raise
             except Exception as e:
                 error_details = str(e)
                 import traceback
@@ -445,9 +1125,22 @@ def transcribe_and_translate(
                         os.unlink(video_output_path)
                     except:
                         pass
+            finally:
+                if session_id and _full_render_skips.get(session_id) is render_token:
+                    del _full_render_skips[session_id]
+                if ass_file and os.path.exists(ass_file):
+                    os.unlink(ass_file)
         else:
             progress(0.8, desc="Skipping video generation (audio file, not video)")
         
+        if failed_indices and plan["decision"] != "reject":
+            schedule_deferred_translation(
+                store, job_id, segments, translator, failed_indices, srt_file,
+                source_path=audio_path if video_output else None,
+                video_path=video_output, video_is_preview=video_is_preview,
+                max_age=deferred_max_age,
+            )
+        
         progress(1.0, desc="Complete!")
         
         # Append video error to English text if video failed (so user can see it)
@@ -457,7 +1150,9 @@ def transcribe_and_translate(
         # Final yield with video ready (or None if not video or failed)
         srt_label_final = "📄 SRT Subtitle File (for CapCut) ✅"
         video_label_final = "🎬 Video with Burned-in Subtitles (Korean + English)"
-        if video_output:
+        if video_output and video_is_preview:
+            video_label_final = f"{video_label_final} ✅ (preview quality)"
+        elif video_output:
             video_label_final = f"{video_label_final} ✅"
         elif is_video:
             video_label_final = f"{video_label_final} ❌ Failed"
@@ -470,17 +1165,62 @@ def transcribe_and_translate(
             english_text,
         )
         
+    except JobCancelled as e:
+        cancelled = True
+        print(f"🛑 Job {job_id} cancelled: {e}")
+    except GeneratorExit:
+        # The consumer stopped iterating (client gone); stop any remaining work
+        cancelled = True
+        token.cancel("job abandoned")
+        raise
     except Exception as e:
         error_msg = f"Error: {str(e)}"
         import traceback
         traceback.print_exc()
         yield None, None, error_msg, None
+    finally:
+        get_controller().release(admission_ticket)
+        finish_session_job(session_id, token)
+        if cancelled and owns_job_dir:
+            # Nobody will download this job's outputs; free the disk space now
+            store.remove(job_id)
+        else:
+            store.release(job_id)
+
+
+def mark_session_seen(session_id: str | None) -> None:
+    """Record that a browser session is still around (it made a request)."""
+    if session_id:
+        _session_last_seen[session_id] = time.monotonic()
+
+
+def cancel_session_jobs(request: gr.Request):
+    """Cancel the running job of a browser session once it has been gone for the grace period."""
+    if request is None:
+        return
+    timer = threading.Timer(
+        UNLOAD_GRACE_SECONDS, _cancel_if_not_seen, args=(request.session_hash, time.monotonic()),
+    )
+    timer.daemon = True
+    timer.start()
+
+
+def _cancel_if_not_seen(session_id: str, disconnected_at: float) -> None:
+    if _session_last_seen.get(session_id, 0.0) > disconnected_at:
+        print(f"🔌 Session {session_id} came back; keeping its job")
+        return
+    _session_last_seen.pop(session_id, None)
+    _session_jobs.pop(session_id, None)
+    if cancel_session(session_id, "browser tab closed"):
+        print(f"🛑 Cancelled job for closed session {session_id}")
 
 
 # Create Gradio interface
+# Gradio copies every returned SRT/video into its own cache; expire those copies with the store's TTL
 with gr.Blocks(
     title="Papago Korean Translation",
     theme=gr.themes.Soft(),
+    delete_cache=(GRADIO_CACHE_SWEEP_INTERVAL, int(get_store().ttl_seconds)),
     css='''
     :root { --card-bg: #ffffff; --card-border: #e8e8e8; --muted: #6b7280; }
     #status-bar { position: sticky; top: 0; z-index: 10; background: #f8fafc; border-bottom: 1px solid #e5e7eb; padding: 8px 12px; }
@@ -533,8 +1273,10 @@ with gr.Blocks(
             with gr.Row():
                 with gr.Column(elem_classes=["card"]):
                     srt_output = gr.File(label="📄 SRT Subtitle File (for CapCut)")
+                    refresh_btn = gr.Button("🔄 Refresh outputs", size="sm")
                 with gr.Column(elem_classes=["card"]):
                     video_output = gr.Video(label="🎬 Video with Burned-in Subtitles (Korean + English)")
+                    skip_full_btn = gr.Button("⏭️ Keep preview (skip full-quality render)", size="sm")
             
             with gr.Tabs():
                 with gr.Tab("Korean Transcription"):
@@ -575,9 +1317,12 @@ with gr.Blocks(
             """
             - Upload a Korean audio/video file or paste a direct URL
             - Processing auto-starts after upload; SRT appears first
-            - Video downloads after burn-in completes
-            - If on mobile, you can switch apps—processing continues server-side
-            """
+            - A fast low-res preview video appears first; the full-quality video replaces it when ready
+            - Tap "Keep preview" if the preview is good enough and you don't need the full-quality render
+            - If on mobile, you can switch apps—processing continues server-side for {grace_minutes:.0f} minutes; when you're back, tap "🔄 Refresh outputs" (this also keeps the job running)
+            - Closing the tab or uploading another file cancels the current job
+            - If Papago was unavailable, English is added later: tap "🔄 Refresh outputs" to get the updated files
+            """.format(grace_minutes=UNLOAD_GRACE_SECONDS / 60)
         )
 
     # FOOTER (removed on request)
@@ -589,6 +1334,25 @@ with gr.Blocks(
         outputs=[srt_output, video_output, korean_output, english_output]
     )
 
+    # Closing the tab cancels that session's running job (after a grace period) so its queue slot frees up
+    demo.unload(cancel_session_jobs)
+
+    # Skip the follow-up full-quality render; runs outside the queue so it is never stuck behind jobs
+    skip_full_btn.click(
+        fn=skip_full_render,
+        inputs=None,
+        outputs=None,
+        queue=False
+    )
+
+    # Re-read the job directory after a deferred translation has rewritten the SRT/video
+    refresh_btn.click(
+        fn=refresh_outputs,
+        inputs=None,
+        outputs=[srt_output, video_output],
+        queue=False
+    )
+
     # Connect quick text translation
     translate_btn.click(
         fn=translate_text_direct,
@@ -611,13 +1375,122 @@ with gr.Blocks(
     )
 
 
+record_timing("app", time.perf_counter() - _APP_IMPORT_START)
+
+
+def render_metrics() -> str:
+    """Papago usage, deferred translations and circuit state in Prometheus text format."""
+    usage = get_usage_meter().snapshot()
+    lines = [
+        "# HELP papago_chars_used_today Characters sent to Papago in the current quota day, per API key label.",
+        "# TYPE papago_chars_used_today gauge",
+    ]
+    for label, chars in sorted(usage["used"].items()):
+        lines.append(f'papago_chars_used_today{{key="{label}"}} {chars}')
+    lines += [
+        "# HELP papago_daily_char_limit Daily character budget per API key (0 = unlimited).",
+        "# TYPE papago_daily_char_limit gauge",
+        f"papago_daily_char_limit {usage['daily_limit']}",
+        "# HELP papago_deferred_segments Segments waiting for a deferred re-translation.",
+        "# TYPE papago_deferred_segments gauge",
+        f"papago_deferred_segments {_deferred_translations.pending_count()}",
+    ]
+    client_id = os.getenv("PAPAGO_CLIENT_ID")
+    if client_id:
+        circuit_open = int(get_breaker(client_id).state != "closed")
+        lines += [
+            "# HELP papago_circuit_open 1 while the Papago circuit breaker is open or half-open.",
+            "# TYPE papago_circuit_open gauge",
+            f'papago_circuit_open{{key="{key_label(client_id)}"}} {circuit_open}',
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def create_server_app():
+    """Wrap the Gradio UI in a FastAPI app that also serves health endpoints.
+
+    - /healthz: liveness; always 200 with warm-up state, import timings and memory admission state
+    - /readyz: 200 once the Whisper model is warm (always in worker mode), 503 while warming or failed
+    - /outputs/<job_id>/<name>: current job files (picks up deferred re-translations)
+    - /metrics: Papago character usage and translation state for Prometheus
+    """
+    from fastapi import FastAPI
+    from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+    import warmup
+
+    server = FastAPI()
+
+    class SessionTracker:
+        """Note requests that name a session (heartbeat path, ?session_hash=) for the unload grace period."""
+
+        def __init__(self, app):
+            self.app = app
+
+        async def __call__(self, scope, receive, send):
+            if scope["type"] == "http":
+                match = HEARTBEAT_PATH.search(scope.get("path", ""))
+                if match:
+                    mark_session_seen(match.group(1))
+                for session_id in urllib.parse.parse_qs(scope.get("query_string", b"").decode("latin-1")).get("session_hash", []):
+                    mark_session_seen(session_id)
+            await self.app(scope, receive, send)
+
+    server.add_middleware(SessionTracker)
+
+    @server.get("/healthz")
+    def healthz():
+        return {**warmup.health(), "admission": get_controller().snapshot()}
+
+    @server.get("/readyz")
+    def readyz():
+        if _job_queue is not None:
+            # Worker-mode frontend: jobs run on workers, so there is no model to wait for
+            return JSONResponse({"state": "ready", "mode": "worker-frontend"}, status_code=200)
+        snapshot = warmup.state.snapshot()
+        return JSONResponse(snapshot, status_code=200 if warmup.state.ready else 503)
+
+    @server.get("/outputs/{job_id}/{name}")
+    def job_output(job_id: str, name: str):
+        # Current files from the artifact store, including ones rewritten by deferred translation
+        store = get_store()
+        try:
+            path = store.path(job_id, name)
+        except ValueError:
+            return JSONResponse({"error": "not found"}, status_code=404)
+        if PARTIAL_SUFFIX in name or not os.path.isfile(path):
+            return JSONResponse({"error": "not found"}, status_code=404)
+        store.touch(job_id)
+        return FileResponse(path, filename=name)
+
+    @server.get("/metrics")
+    def metrics():
+        return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+    # Artifacts may live outside the temp dir when ARTIFACT_ROOT is set
+    return gr.mount_gradio_app(server, demo, path="/", allowed_paths=[get_store().root])
+
+
 if __name__ == "__main__":
+    import uvicorn
+    from warmup import format_import_report
+
+    _patch_gradio_client_schema()
+    # Load Whisper in the background; the UI is served immediately and jobs wait for the model
+    # (in worker mode the workers load it instead)
+    if USE_WHISPER and _job_queue is None:
+        start_warmup(WHISPER_MODEL)
+    print(format_import_report())
+
     # Enable queue with increased timeout to prevent mobile disconnection issues
-    # Jobs continue server-side even if client disconnects
+    # Jobs keep running for UNLOAD_GRACE_SECONDS after the client disconnects, longer if it comes back
     demo.queue(
         default_concurrency_limit=2,
         max_size=64,
         status_update_rate=1
     )
-    # Let Gradio auto-detect for Hugging Face Spaces
-    demo.launch()
+    # Same host/port variables Gradio reads, so Hugging Face Spaces works unchanged
+    uvicorn.run(
+        create_server_app(),
+        host=os.getenv("GRADIO_SERVER_NAME", "127.0.0.1"),
+        port=int(os.getenv("GRADIO_SERVER_PORT", "7860")),
+    )
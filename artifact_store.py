@@ -0,0 +1,305 @@
+"""
+Artifact Store
+Manages per-job output directories (downloads, SRT, ASS, rendered video) with a
+disk quota, LRU eviction, TTL cleanup and atomic write-then-rename.
+"""
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+DEFAULT_QUOTA_MB = 2048
+DEFAULT_TTL_SECONDS = 6 * 3600
+DEFAULT_JANITOR_INTERVAL = 300
+
+# Marker for in-progress writes; leftovers from a crash are removed with their job directory
+PARTIAL_SUFFIX = ".partial"
+
+# Processes sharing a root (frontend and workers) mark the jobs they use with a file that
+# their janitor keeps fresh; other processes' markers older than the TTL are from dead processes
+ACTIVE_MARKER_PREFIX = ".active-"
+ACTIVE_REFRESH_INTERVAL = 60
+ACTIVE_MARKER_TTL = 5 * ACTIVE_REFRESH_INTERVAL
+
+
+def is_plain_name(name: str) -> bool:
+    """True for a single visible path component (no separators, no '.'/'..', no hidden files)."""
+    return (
+        isinstance(name, str)
+        and bool(name)
+        and not name.startswith(".")
+        and "/" not in name
+        and "\\" not in name
+        and "\x00" not in name
+    )
+
+
+def _dir_size(path: str) -> int:
+    """Return the total size in bytes of all files under path."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class ArtifactStore:
+    """Stores job artifacts in unique per-job directories under a single root.
+
+    - Each job gets its own directory, so concurrent jobs never collide
+    - Total disk usage is capped; least recently used jobs are evicted first
+    - Jobs older than the TTL are removed by a background janitor
+    - Jobs that are still running (acquired) are never evicted, including jobs
+      acquired by other processes or hosts that share the same root
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        quota_bytes: int = DEFAULT_QUOTA_MB * 1024 * 1024,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        janitor_interval: float = DEFAULT_JANITOR_INTERVAL,
+    ):
+        self.root = root or os.path.join(tempfile.gettempdir(), "papago_artifacts")
+        self.quota_bytes = quota_bytes
+        self.ttl_seconds = ttl_seconds
+        self.janitor_interval = janitor_interval
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._active: Dict[str, int] = {}
+        self._marker_name = f"{ACTIVE_MARKER_PREFIX}{socket.gethostname()}-{os.getpid()}"
+        self._janitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Job directories
+    # ------------------------------------------------------------------
+    def new_job(self, prefix: str = "job") -> str:
+        """Create a unique job directory and mark it active. Returns the job id."""
+        job_id = f"{prefix}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.job_dir(job_id), exist_ok=False)
+        self.acquire(job_id)
+        return job_id
+
+    def job_dir(self, job_id: str) -> str:
+        if not is_plain_name(job_id):
+            raise ValueError(f"Invalid job id: {job_id!r}")
+        return os.path.join(self.root, job_id)
+
+    def path(self, job_id: str, name: str) -> str:
+        """Return the path of an artifact inside a job directory (names may not leave it)."""
+        if not is_plain_name(name):
+            raise ValueError(f"Invalid artifact name: {name!r}")
+        return os.path.join(self.job_dir(job_id), name)
+
+    def acquire(self, job_id: str) -> None:
+        """Protect a job directory from eviction while it is being used (by any process)."""
+        with self._lock:
+            self._active[job_id] = self._active.get(job_id, 0) + 1
+        self._write_marker(job_id)
+
+    def release(self, job_id: str) -> None:
+        """Allow a job directory to be evicted again and enforce the quota."""
+        with self._lock:
+            count = self._active.get(job_id, 0) - 1
+            if count > 0:
+                self._active[job_id] = count
+            else:
+                self._active.pop(job_id, None)
+        if count <= 0:
+            try:
+                os.unlink(os.path.join(self.job_dir(job_id), self._marker_name))
+            except OSError:
+                pass
+        self.touch(job_id)
+        self.enforce_quota()
+
+    def _write_marker(self, job_id: str) -> None:
+        marker = os.path.join(self.job_dir(job_id), self._marker_name)
+        try:
+            with open(marker, "a"):
+                pass
+            os.utime(marker, None)
+        except OSError:
+            pass
+
+    def refresh_active(self) -> None:
+        """Refresh this process's markers so other processes keep honouring them."""
+        with self._lock:
+            job_ids = list(self._active)
+        for job_id in job_ids:
+            self._write_marker(job_id)
+
+    def is_active(self, job_id: str) -> bool:
+        """True if this process or a live process sharing the root is using the job."""
+        with self._lock:
+            if job_id in self._active:
+                return True
+        job_dir = os.path.join(self.root, job_id)
+        cutoff = time.time() - ACTIVE_MARKER_TTL
+        try:
+            names = os.listdir(job_dir)
+        except OSError:
+            return False
+        for name in names:
+            if not name.startswith(ACTIVE_MARKER_PREFIX):
+                continue
+            try:
+                if os.path.getmtime(os.path.join(job_dir, name)) >= cutoff:
+                    return True
+            except OSError:
+                continue
+        return False
+
+    def touch(self, job_id: str) -> None:
+        """Record an access so LRU eviction keeps recently used jobs."""
+        try:
+            os.utime(self.job_dir(job_id), None)
+        except OSError:
+            pass
+
+    def remove(self, job_id: str) -> None:
+        """Delete a job directory and everything in it."""
+        with self._lock:
+            self._active.pop(job_id, None)
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Atomic writes
+    # ------------------------------------------------------------------
+    @contextmanager
+    def atomic_path(self, final_path: str) -> Iterator[str]:
+        """Yield a temporary path next to final_path; rename it into place on success.
+
+        The temporary name keeps the original extension so tools like ffmpeg can
+        still infer the output format from it.
+        """
+        base, ext = os.path.splitext(final_path)
+        tmp_path = f"{base}{PARTIAL_SUFFIX}-{uuid.uuid4().hex[:6]}{ext}"
+        try:
+            yield tmp_path
+            os.replace(tmp_path, final_path)
+        finally:
+            if os.path.exists(tmp_path):
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+
+    def write_text(self, final_path: str, content: str, encoding: str = "utf-8", newline: Optional[str] = None) -> str:
+        """Atomically write a text file so readers never see partial content."""
+        with self.atomic_path(final_path) as tmp_path:
+            with open(tmp_path, "w", encoding=encoding, newline=newline) as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+        return final_path
+
+    # ------------------------------------------------------------------
+    # Quota and TTL
+    # ------------------------------------------------------------------
+    def _jobs_by_age(self) -> List[Tuple[float, str, int]]:
+        """Return (last_access, job_id, size) for every job, oldest first."""
+        jobs = []
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return jobs
+        for name in names:
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            jobs.append((mtime, name, _dir_size(path)))
+        jobs.sort()
+        return jobs
+
+    def usage_bytes(self) -> int:
+        return sum(size for _, _, size in self._jobs_by_age())
+
+    def enforce_quota(self) -> List[str]:
+        """Evict least recently used, inactive jobs until usage fits the quota."""
+        jobs = self._jobs_by_age()
+        total = sum(size for _, _, size in jobs)
+        evicted = []
+        for _mtime, job_id, size in jobs:
+            if total <= self.quota_bytes:
+                break
+            if self.is_active(job_id):
+                continue
+            shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+            total -= size
+            evicted.append(job_id)
+        if evicted:
+            print(f"🧹 Evicted {len(evicted)} job(s) to stay under artifact quota")
+        return evicted
+
+    def sweep_expired(self) -> List[str]:
+        """Remove inactive jobs whose last access is older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        expired = []
+        for mtime, job_id, _size in self._jobs_by_age():
+            if mtime >= cutoff:
+                break
+            if self.is_active(job_id):
+                continue
+            shutil.rmtree(os.path.join(self.root, job_id), ignore_errors=True)
+            expired.append(job_id)
+        return expired
+
+    def start_janitor(self) -> None:
+        """Start the background TTL/quota cleanup thread (idempotent)."""
+        if self._janitor is not None and self._janitor.is_alive():
+            return
+        self._stop.clear()
+        self._janitor = threading.Thread(target=self._janitor_loop, name="artifact-janitor", daemon=True)
+        self._janitor.start()
+
+    def stop_janitor(self) -> None:
+        self._stop.set()
+
+    def _janitor_loop(self) -> None:
+        last_sweep = time.monotonic()
+        while not self._stop.wait(min(self.janitor_interval, ACTIVE_REFRESH_INTERVAL)):
+            try:
+                self.refresh_active()
+                if time.monotonic() - last_sweep >= self.janitor_interval:
+                    last_sweep = time.monotonic()
+                    self.sweep_expired()
+                    self.enforce_quota()
+            except Exception as e:
+                print(f"⚠️ Artifact janitor error: {e}")
+
+
+_default_store: Optional[ArtifactStore] = None
+_default_lock = threading.Lock()
+
+
+def get_store() -> ArtifactStore:
+    """Return the process-wide artifact store, configured from environment variables.
+
+    ARTIFACT_ROOT, ARTIFACT_QUOTA_MB and ARTIFACT_TTL_SECONDS override the defaults.
+    """
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore(
+                root=os.getenv("ARTIFACT_ROOT") or None,
+                quota_bytes=int(float(os.getenv("ARTIFACT_QUOTA_MB", DEFAULT_QUOTA_MB)) * 1024 * 1024),
+                ttl_seconds=float(os.getenv("ARTIFACT_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            )
+            _default_store.start_janitor()
+        return _default_store
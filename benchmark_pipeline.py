@@ -0,0 +1,367 @@
+"""
+Pipeline Benchmark
+Measures the transcription/translation/render pipeline end to end on synthetic media,
+with a deterministic Whisper stand-in and a local Papago stand-in (no network, no GPU).
+
+Usage:
+    python benchmark_pipeline.py --durations 10,60 --resolutions 640x360,1280x720
+    python benchmark_pipeline.py --write-baseline benchmark_baseline.json
+    python benchmark_pipeline.py --check benchmark_baseline.json --tolerance 0.25
+
+Reports per-stage latency percentiles, throughput (x realtime / segments per second)
+and peak RSS as JSON. Each case runs in its own subprocess, so peak RSS is per case.
+`--check` exits with status 1 when a stage regresses past the tolerance relative to
+the baseline file.
+"""
+
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+
+KOREAN_LINES = [
+    "안녕하세요, 오늘은 날씨가 정말 좋네요.",
+    "이 영상에서는 한국어 자막을 만드는 방법을 알아봅니다.",
+    "먼저 음성을 텍스트로 변환합니다.",
+    "그 다음 파파고로 영어 번역을 합니다.",
+    "마지막으로 자막을 영상에 입힙니다.",
+    "감사합니다.",
+]
+
+SEGMENT_SECONDS = 3.0
+
+
+class StubWhisperModel:
+    """Deterministic stand-in for a Whisper model: one segment every SEGMENT_SECONDS."""
+
+    def __init__(self, duration: float):
+        self.duration = duration
+
+    def transcribe(self, audio_path: str, language: str = "ko", task: str = "transcribe") -> Dict[str, Any]:
+        segments = []
+        start = 0.0
+        i = 0
+        while start < self.duration:
+            end = min(start + SEGMENT_SECONDS - 0.2, self.duration)
+            segments.append({
+                "id": i,
+                "start": round(start, 3),
+                "end": round(end, 3),
+                "text": " " + KOREAN_LINES[i % len(KOREAN_LINES)],
+            })
+            start += SEGMENT_SECONDS
+            i += 1
+        return {"text": "".join(s["text"] for s in segments), "segments": segments, "language": "ko"}
+
+
+class LocalTranslator:
+    """Deterministic stand-in for PapagoTranslator with optional simulated latency."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_ms = latency_ms
+        self.call_latencies: List[float] = []
+
+    def translate_ko_to_en(self, text: str, timeout: int = 30) -> str:
+        start = time.perf_counter()
+        if not text.strip():
+            return ""
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        result = "[en] " + " ".join(f"word{len(word)}" for word in text.split())
+        self.call_latencies.append(time.perf_counter() - start)
+        return result
+
+
+def make_synthetic_media(path: str, duration: float, width: int, height: int) -> str:
+    """Generate a test video (testsrc2 + sine tone) with ffmpeg lavfi."""
+    cmd = [
+        "ffmpeg", "-v", "error",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=25:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=16000:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-shortest", "-y", path,
+    ]
+    subprocess.run(cmd, check=True, capture_output=True)
+    return path
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p90_ms": round(percentile(samples, 90) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+        "n": len(samples),
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """High-water RSS of this process and of the largest child (ffmpeg) so far.
+
+    ru_maxrss covers the whole process lifetime, which is why every case runs in its own process.
+    """
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # ru_maxrss is bytes on macOS, KiB on Linux
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor, 1),
+    }
+
+
+def _timed(fn: Callable[[], Any]):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_case(duration: float, width: int, height: int, repeats: int, work_dir: str,
+             translate_latency_ms: float, render: bool) -> Dict[str, Any]:
+    """Run every pipeline stage `repeats` times on one synthetic input."""
+    import app
+    from papago_translation import segments_to_srt
+    from segment_store import SegmentStore
+
+    media_path = make_synthetic_media(os.path.join(work_dir, f"synthetic_{int(duration)}s_{width}x{height}.mp4"),
+                                      duration, width, height)
+    model = StubWhisperModel(duration)
+    timings: Dict[str, List[float]] = {}
+    translator = LocalTranslator(translate_latency_ms)
+    segments = []
+
+    def record(stage: str, seconds: float) -> None:
+        timings.setdefault(stage, []).append(seconds)
+
+    for _ in range(repeats):
+        (probed_duration, (probed_w, probed_h)), t = _timed(
+            lambda: (app.get_media_duration_seconds(media_path), app.probe_video_size(media_path))
+        )
+        # The probe helpers return None on failure, which would time a failing subprocess
+        if probed_duration is None or probed_w is None or probed_h is None:
+            raise RuntimeError("probe: ffprobe could not read the synthetic media")
+        record("probe", t)
+        result, t = _timed(lambda: SegmentStore.from_whisper(model.transcribe(media_path, language="ko")["segments"]))
+        segments = result
+        record("asr_stub", t)
+        _, t = _timed(lambda: segments_to_srt(segments, translator))
+        record("srt", t)
+        _, t = _timed(lambda: app.create_ass_subtitles(segments, translator, play_res_x=width, play_res_y=height))
+        record("ass", t)
+        if render:
+            for preview in (True, False):
+                out_path = os.path.join(work_dir, f"render_{'preview' if preview else 'full'}.mp4")
+                _, t = _timed(lambda: app.burn_subtitles_to_video(media_path, segments, translator, out_path, preview=preview))
+                record("render_preview" if preview else "render_full", t)
+                os.unlink(out_path)
+        _, t = _timed(lambda: run_end_to_end(app, media_path, model, translator, render))
+        record("end_to_end", t)
+
+    stages = {}
+    for stage, samples in timings.items():
+        stats = summarize(samples)
+        p50 = percentile(samples, 50)
+        if p50 > 0:
+            stats["x_realtime"] = round(duration / p50, 2)
+            if stage in ("srt", "ass"):
+                stats["segments_per_s"] = round(len(segments) / p50, 1)
+        stages[stage] = stats
+    return {
+        "duration_s": duration,
+        "resolution": f"{width}x{height}",
+        "segments": len(segments),
+        "stages": stages,
+        "translate_call": summarize(translator.call_latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def run_end_to_end(app, media_path: str, model: StubWhisperModel, translator: LocalTranslator, render: bool) -> None:
+    """Drive the in-process pipeline with the stand-ins swapped in for Whisper and Papago."""
+    import warmup
+
+    saved = (app.PapagoTranslator, app.USE_WHISPER, warmup._models.get(app.WHISPER_MODEL))
+    warmup._models[app.WHISPER_MODEL] = model
+    app.USE_WHISPER = True
+    app.PapagoTranslator = lambda client_id, client_secret: translator
+    # Audio-only input skips the render stages when rendering is disabled
+    path = media_path if render else media_path + ".m4a"
+    if not render and not os.path.exists(path):
+        shutil.copyfile(media_path, path)
+    outputs = None
+    try:
+        for outputs in app.run_pipeline(path, None):
+            pass
+    finally:
+        app.PapagoTranslator, app.USE_WHISPER, cached_model = saved
+        if cached_model is None:
+            warmup._models.pop(app.WHISPER_MODEL, None)
+        else:
+            warmup._models[app.WHISPER_MODEL] = cached_model
+    check_pipeline_outputs(outputs, expect_video=render)
+
+
+def check_pipeline_outputs(outputs, expect_video: bool) -> None:
+    """Raise if the pipeline's final yield is an error instead of real outputs.
+
+    run_pipeline reports failures as a normal yield, so without this a broken pipeline
+    would be timed as a fast end-to-end run.
+    """
+    if outputs is None:
+        raise RuntimeError("end_to_end: pipeline yielded nothing")
+    srt_update, video_update, korean_text, english_text = outputs
+
+    def value(update):
+        return update.get("value") if isinstance(update, dict) else update
+
+    if not value(srt_update) or str(korean_text or "").startswith("Error"):
+        raise RuntimeError(f"end_to_end: pipeline failed: {korean_text}")
+    if expect_video and not value(video_update):
+        raise RuntimeError(f"end_to_end: no video rendered: {english_text}")
+
+
+def check_regressions(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Compare p50 stage latencies and peak RSS against a baseline; return regression messages."""
+    problems = []
+    for case_name, case in results["cases"].items():
+        base_case = baseline.get("cases", {}).get(case_name)
+        if base_case is None:
+            continue
+        for stage, stats in case["stages"].items():
+            base_stats = base_case["stages"].get(stage)
+            if not base_stats or base_stats["p50_ms"] <= 0:
+                continue
+            ratio = stats["p50_ms"] / base_stats["p50_ms"]
+            if ratio > 1 + tolerance:
+                problems.append(f"{case_name}/{stage}: p50 {stats['p50_ms']} ms vs baseline {base_stats['p50_ms']} ms (+{(ratio - 1) * 100:.0f}%)")
+        base_rss = base_case.get("peak_rss_mb", {}).get("self", 0)
+        rss = case["peak_rss_mb"]["self"]
+        if base_rss and rss > base_rss * (1 + tolerance):
+            problems.append(f"{case_name}: peak RSS {rss} MB vs baseline {base_rss} MB")
+    return problems
+
+
+def run_case_subprocess(duration: float, width: int, height: int, repeats: int, work_dir: str,
+                        translate_latency_ms: float, render: bool) -> Dict[str, Any]:
+    """Run one case via `--run-case` in a fresh interpreter and return its results."""
+    # The pipeline logs to stdout, so the case reports through a file
+    result_path = os.path.join(work_dir, f"case_{int(duration)}s_{width}x{height}.json")
+    cmd = [
+        sys.executable, os.path.abspath(__file__), "--run-case", f"{duration}:{width}x{height}",
+        "--repeats", str(repeats), "--translate-latency-ms", str(translate_latency_ms),
+        "--work-dir", work_dir, "--output", result_path,
+    ]
+    if not render:
+        cmd.append("--no-render")
+    proc = subprocess.run(cmd, stdout=sys.stderr)
+    if proc.returncode != 0:
+        raise RuntimeError(f"case {int(duration)}s_{width}x{height} failed (exit {proc.returncode})")
+    with open(result_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv: List[str] | None = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the subtitle pipeline on synthetic media")
+    parser.add_argument("--durations", default="10,60", help="Comma-separated media durations in seconds")
+    parser.add_argument("--resolutions", default="640x360,1280x720", help="Comma-separated WxH list")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--translate-latency-ms", type=float, default=0.0, help="Simulated Papago latency per call")
+    parser.add_argument("--no-render", action="store_true", help="Skip the ffmpeg burn-in stages")
+    parser.add_argument("--output", help="Write results JSON to this path (default: stdout)")
+    parser.add_argument("--write-baseline", metavar="PATH", help="Save results as the new baseline")
+    parser.add_argument("--check", metavar="PATH", help="Compare results against a baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown ratio for --check")
+    # Internal: run a single DURATION:WxH case and write its JSON to --output (one process per case)
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        duration, resolution = args.run_case.split(":")
+        width, height = (int(v) for v in resolution.split("x"))
+        case = run_case(float(duration), width, height, args.repeats, args.work_dir,
+                        args.translate_latency_ms, render=not args.no_render)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(case, f, ensure_ascii=False)
+        return 0
+
+    missing = [tool for tool in ("ffmpeg", "ffprobe") if shutil.which(tool) is None]
+    if missing:
+        print(f"{' and '.join(missing)} not found on PATH; ffmpeg generates the synthetic media "
+              "and ffprobe is timed by the probe stage", file=sys.stderr)
+        return 2
+
+    durations = [float(d) for d in args.durations.split(",") if d]
+    resolutions = [tuple(int(v) for v in r.lower().split("x")) for r in args.resolutions.split(",") if r]
+
+    results: Dict[str, Any] = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeats": args.repeats,
+            "translate_latency_ms": args.translate_latency_ms,
+            "render": not args.no_render,
+        },
+        "cases": {},
+    }
+    work_dir = tempfile.mkdtemp(prefix="papago_bench_")
+    # Keep benchmark artifacts out of the app's real artifact store; the stand-in translator ignores credentials
+    os.environ.setdefault("ARTIFACT_ROOT", os.path.join(work_dir, "artifacts"))
+    os.environ.setdefault("PAPAGO_CLIENT_ID", "benchmark")
+    os.environ.setdefault("PAPAGO_CLIENT_SECRET", "benchmark")
+    try:
+        for duration in durations:
+            for width, height in resolutions:
+                case_name = f"{int(duration)}s_{width}x{height}"
+                print(f"▶️ {case_name}", file=sys.stderr)
+                results["cases"][case_name] = run_case_subprocess(
+                    duration, width, height, args.repeats, work_dir,
+                    args.translate_latency_ms, render=not args.no_render,
+                )
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    payload = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+    else:
+        print(payload)
+    if args.write_baseline:
+        with open(args.write_baseline, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print(f"💾 Baseline written to {args.write_baseline}", file=sys.stderr)
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = check_regressions(results, baseline, args.tolerance)
+        for problem in problems:
+            print(f"❌ Regression: {problem}", file=sys.stderr)
+        if problems:
+            return 1
+        print("✅ No regressions beyond tolerance", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
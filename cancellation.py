@@ -0,0 +1,190 @@
+"""
+Job Cancellation
+Cooperative cancellation tokens for pipeline jobs. A token is checked between
+Whisper decoding windows and translation calls, and kills any ffmpeg child
+process registered with it, so a cancelled job frees its queue slot right away.
+"""
+
+import importlib
+import importlib.util
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancel token has been cancelled."""
+
+
+class CancelToken:
+    """Thread-safe cancellation flag with child tokens and process cleanup.
+
+    is_set() makes a token usable wherever a threading.Event is expected.
+    """
+
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes: List = []
+        self._children: List["CancelToken"] = []
+        self._callbacks: List[Callable[[Optional[str]], None]] = []
+        self.reason: Optional[str] = None
+        if parent is not None:
+            parent._add_child(self)
+
+    def _add_child(self, child: "CancelToken") -> None:
+        with self._lock:
+            self._children.append(child)
+            cancelled = self._event.is_set()
+        if cancelled:
+            child.cancel(self.reason)
+
+    def child(self) -> "CancelToken":
+        """Return a token cancelled with this one, but cancellable on its own."""
+        return CancelToken(parent=self)
+
+    def cancel(self, reason: Optional[str] = "cancelled") -> None:
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            processes = list(self._processes)
+            children = list(self._children)
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            try:
+                callback(reason)
+            except Exception as e:
+                print(f"⚠️ Cancel callback failed: {e}")
+        for proc in processes:
+            try:
+                if proc.poll() is None:
+                    proc.kill()
+            except Exception:
+                pass
+        for child in children:
+            child.cancel(reason)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelled(self.reason or "cancelled")
+
+    def register_process(self, proc) -> None:
+        """Kill proc if this token is (or gets) cancelled."""
+        with self._lock:
+            self._processes.append(proc)
+            cancelled = self._event.is_set()
+        if cancelled and proc.poll() is None:
+            proc.kill()
+
+    def on_cancel(self, callback: Callable[[Optional[str]], None]) -> None:
+        """Call callback(reason) when this token is (or gets) cancelled, e.g. to cancel remote work."""
+        with self._lock:
+            self._callbacks.append(callback)
+            cancelled = self._event.is_set()
+        if cancelled:
+            callback(self.reason)
+
+    def unregister_process(self, proc) -> None:
+        with self._lock:
+            if proc in self._processes:
+                self._processes.remove(proc)
+
+
+# One running job per browser session; a new upload or closing the tab cancels it
+_session_tokens: Dict[str, CancelToken] = {}
+_session_lock = threading.Lock()
+
+
+def start_session_job(session_id: Optional[str], token: Optional[CancelToken] = None) -> CancelToken:
+    """Register a new job token for session_id, cancelling that session's previous job."""
+    token = token or CancelToken()
+    if not session_id:
+        return token
+    with _session_lock:
+        previous = _session_tokens.get(session_id)
+        _session_tokens[session_id] = token
+    if previous is not None:
+        previous.cancel("superseded by a new job")
+    return token
+
+
+def finish_session_job(session_id: Optional[str], token: CancelToken) -> None:
+    with _session_lock:
+        if session_id and _session_tokens.get(session_id) is token:
+            del _session_tokens[session_id]
+
+
+def cancel_session(session_id: Optional[str], reason: str = "session closed") -> bool:
+    """Cancel the running job of session_id, if any. Returns True if one was cancelled."""
+    with _session_lock:
+        token = _session_tokens.pop(session_id, None) if session_id else None
+    if token is None:
+        return False
+    token.cancel(reason)
+    return True
+
+
+# ----------------------------------------------------------------------
+# Whisper window hook
+# ----------------------------------------------------------------------
+_bound = threading.local()
+_whisper_hooked = False
+_whisper_hook_lock = threading.Lock()
+
+
+@contextmanager
+def bind_whisper(token: Optional[CancelToken], on_progress: Optional[Callable[[float], None]] = None):
+    """Check token (and report progress 0..1) after every Whisper decoding window in this thread."""
+    _bound.token = token
+    _bound.on_progress = on_progress
+    try:
+        yield
+    finally:
+        _bound.token = None
+        _bound.on_progress = None
+
+
+def install_whisper_hooks() -> None:
+    """Route whisper.transcribe's progress bar through a cancellation check (idempotent).
+
+    Whisper advances its tqdm bar once per 30 s decoding window, even with the bar
+    hidden, which is the only per-window callback it exposes. Does nothing when
+    Whisper is not installed (e.g. with a stand-in model in benchmarks).
+    """
+    global _whisper_hooked
+    with _whisper_hook_lock:
+        if _whisper_hooked or importlib.util.find_spec("whisper") is None:
+            return
+        transcribe_module = importlib.import_module("whisper.transcribe")
+        base_tqdm = transcribe_module.tqdm.tqdm
+
+        class CancellableTqdm(base_tqdm):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self._frames_done = 0
+                self._frames_total = kwargs.get("total") or 0
+
+            def update(self, n=1):
+                token = getattr(_bound, "token", None)
+                if token is not None:
+                    token.raise_if_cancelled()
+                self._frames_done += n or 0
+                on_progress = getattr(_bound, "on_progress", None)
+                if on_progress is not None and self._frames_total:
+                    on_progress(min(1.0, self._frames_done / self._frames_total))
+                return super().update(n)
+
+        class _TqdmModule:
+            tqdm = CancellableTqdm
+
+        transcribe_module.tqdm = _TqdmModule
+        _whisper_hooked = True
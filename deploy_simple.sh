@@ -52,6 +52,12 @@ cd "$SPACE_NAME"
 echo "📋 Copying files..."
 cp "../app.py" .
 cp "../papago_translation.py" .
+cp "../artifact_store.py" .
+cp "../warmup.py" .
+cp "../job_queue.py" .
+cp "../segment_store.py" .
+cp "../cancellation.py" .
+cp "../admission.py" .
 cp "../requirements_hf.txt" requirements.txt
 cp "../README_HF.md" README.md
 
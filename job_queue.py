@@ -0,0 +1,383 @@
+"""
+Job Queue
+Shared queue of pipeline jobs for worker mode. Workers on this host or on others
+claim jobs under a time-limited lease, heartbeat while they work, and the lease
+is handed to another worker if one dies. Cancelling a job makes its worker's next
+heartbeat fail, which stops the worker's pipeline.
+
+Two backends with the same interface:
+- LocalJobQueue: SQLite file (one host, or a shared filesystem that supports locking)
+- HttpJobQueue: client for the small HTTP coordinator in this module
+
+Run the coordinator with: python job_queue.py --db jobs.db --port 8765
+(it listens on 127.0.0.1 unless --host is given, which requires JOB_QUEUE_TOKEN)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, Optional
+
+from artifact_store import is_plain_name
+
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+DEFAULT_LEASE_SECONDS = 60.0
+DEFAULT_MAX_ATTEMPTS = 3
+FINISHED_RETENTION_SECONDS = 24 * 3600
+
+
+def validate_payload(job_id: str, payload: Dict[str, Any]) -> None:
+    """Reject job ids, media names and URLs that would reach outside the artifact store."""
+    if not is_plain_name(job_id):
+        raise ValueError(f"invalid job id {job_id!r}")
+    if not isinstance(payload, dict):
+        raise ValueError("payload must be an object")
+    media = payload.get("media")
+    if media is not None and not is_plain_name(media):
+        raise ValueError(f"invalid media name {media!r}")
+    url = payload.get("url")
+    if url is not None and not (isinstance(url, str) and url.lower().startswith(("http://", "https://"))):
+        raise ValueError("url must be http(s)")
+
+
+class LocalJobQueue:
+    """SQLite-backed job queue with lease-based ownership."""
+
+    def __init__(self, path: str, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    progress REAL NOT NULL DEFAULT 0,
+                    desc TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Autocommit mode; claim() opens its own write transaction
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_job(row: Optional[sqlite3.Row]) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def submit(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job. job_id and payload["media"] name files in the artifact store, so both must be plain names."""
+        validate_payload(job_id, payload)
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, payload, status, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (job_id, json.dumps(payload), QUEUED, now, now),
+            )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job, reclaiming expired leases first so a dead worker's job does not stay leased."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim_expired(conn, now)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def _reclaim_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        # Workers that stopped heartbeating lose their jobs; give up after max_attempts
+        conn.execute(
+            "UPDATE jobs SET status = ?, error = 'Worker lease expired too many times', updated = ? "
+            "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+            (FAILED, now, LEASED, now, self.max_attempts),
+        )
+        conn.execute(
+            "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, updated = ? "
+            "WHERE status = ? AND lease_expires < ?",
+            (QUEUED, now, LEASED, now),
+        )
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        """Lease the oldest queued job to worker_id, after reclaiming expired leases."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._reclaim_expired(conn, now)
+                conn.execute(
+                    "DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?",
+                    (DONE, FAILED, now - FINISHED_RETENTION_SECONDS),
+                )
+                row = conn.execute(
+                    "SELECT id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, "
+                    "desc = 'Claimed by worker', updated = ? WHERE id = ?",
+                    (LEASED, worker_id, now + lease_seconds, now, row["id"]),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return self.get(row["id"])
+
+    def heartbeat(
+        self,
+        job_id: str,
+        worker_id: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+        progress: Optional[float] = None,
+        desc: Optional[str] = None,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> bool:
+        """Extend the lease and record progress. Returns False if the worker no longer owns the job."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_expires = ?, progress = COALESCE(?, progress), desc = COALESCE(?, desc), "
+                "result = COALESCE(?, result), updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (now + lease_seconds, progress, desc, json.dumps(result) if result is not None else None,
+                 now, job_id, worker_id, LEASED),
+            )
+            return cur.rowcount == 1
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return self._finish(job_id, worker_id, DONE, result=result)
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return self._finish(job_id, worker_id, FAILED, error=error)
+
+    def abandon(self, job_id: str, error: str) -> bool:
+        """Fail a job that no worker has claimed yet. Returns False if it is no longer queued."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ? AND status = ?",
+                (FAILED, error, now, job_id, QUEUED),
+            )
+            return cur.rowcount == 1
+
+    def cancel(self, job_id: str, error: str) -> bool:
+        """Fail a queued or running job; its worker stops at the next heartbeat. Returns False if already finished."""
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, lease_expires = NULL, updated = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (FAILED, error, now, job_id, QUEUED, LEASED),
+            )
+            return cur.rowcount == 1
+
+    def _finish(self, job_id: str, worker_id: str, status: str,
+                result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> bool:
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status = ?, progress = 1.0, result = COALESCE(?, result), error = ?, "
+                "lease_expires = NULL, updated = ? WHERE id = ? AND worker = ? AND status = ?",
+                (status, json.dumps(result) if result is not None else None, error, now, job_id, worker_id, LEASED),
+            )
+            return cur.rowcount == 1
+
+
+class HttpJobQueue:
+    """Client for the HTTP coordinator; same interface as LocalJobQueue."""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 15):
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    def _request(self, method: str, path: str, body: Optional[Dict[str, Any]] = None) -> Any:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(f"{self.base_url}{path}", data=data, method=method)
+        req.add_header("Content-Type", "application/json")
+        if self.token:
+            req.add_header("X-Queue-Token", self.token)
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as res:
+                return json.loads(res.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def submit(self, job_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request("POST", "/jobs", {"id": job_id, "payload": payload})
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def claim(self, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> Optional[Dict[str, Any]]:
+        return self._request("POST", "/claim", {"worker": worker_id, "lease_seconds": lease_seconds})
+
+    def heartbeat(self, job_id: str, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                  progress: Optional[float] = None, desc: Optional[str] = None,
+                  result: Optional[Dict[str, Any]] = None) -> bool:
+        body = {"worker": worker_id, "lease_seconds": lease_seconds, "progress": progress, "desc": desc, "result": result}
+        return bool((self._request("POST", f"/jobs/{job_id}/heartbeat", body) or {}).get("ok"))
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        return bool((self._request("POST", f"/jobs/{job_id}/complete", {"worker": worker_id, "result": result}) or {}).get("ok"))
+
+    def fail(self, job_id: str, worker_id: str, error: str) -> bool:
+        return bool((self._request("POST", f"/jobs/{job_id}/fail", {"worker": worker_id, "error": error}) or {}).get("ok"))
+
+    def abandon(self, job_id: str, error: str) -> bool:
+        return bool((self._request("POST", f"/jobs/{job_id}/abandon", {"error": error}) or {}).get("ok"))
+
+    def cancel(self, job_id: str, error: str) -> bool:
+        return bool((self._request("POST", f"/jobs/{job_id}/cancel", {"error": error}) or {}).get("ok"))
+
+
+def make_coordinator(queue: LocalJobQueue, host: str = "127.0.0.1", port: int = 8765,
+                     token: Optional[str] = None) -> ThreadingHTTPServer:
+    """Build an HTTP server exposing queue over JSON endpoints.
+
+    Anyone who can reach the port can submit jobs for the workers to run, so a token
+    is required unless the server only listens on loopback.
+    """
+    if not token and host not in LOOPBACK_HOSTS:
+        raise ValueError(f"refusing to listen on {host} without a token (set JOB_QUEUE_TOKEN)")
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, body: Any) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _authorized(self) -> bool:
+            if token and self.headers.get("X-Queue-Token") != token:
+                self._reply(401, {"error": "unauthorized"})
+                return False
+            return True
+
+        def _body(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length).decode("utf-8")) if length else {}
+
+        def do_GET(self):
+            if not self._authorized():
+                return
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = queue.get(parts[1])
+                self._reply(200 if job else 404, job or {"error": "not found"})
+            elif parts == ["healthz"]:
+                self._reply(200, {"ok": True})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if not self._authorized():
+                return
+            parts = self.path.strip("/").split("/")
+            try:
+                body = self._body()
+                if parts == ["jobs"]:
+                    self._reply(200, queue.submit(body["id"], body["payload"]))
+                elif parts == ["claim"]:
+                    job = queue.claim(body["worker"], body.get("lease_seconds", DEFAULT_LEASE_SECONDS))
+                    self._reply(200 if job else 404, job or {"error": "no jobs"})
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "heartbeat":
+                    ok = queue.heartbeat(parts[1], body["worker"], body.get("lease_seconds", DEFAULT_LEASE_SECONDS),
+                                         body.get("progress"), body.get("desc"), body.get("result"))
+                    self._reply(200, {"ok": ok})
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "complete":
+                    self._reply(200, {"ok": queue.complete(parts[1], body["worker"], body.get("result") or {})})
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "fail":
+                    self._reply(200, {"ok": queue.fail(parts[1], body["worker"], body.get("error") or "")})
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "abandon":
+                    self._reply(200, {"ok": queue.abandon(parts[1], body.get("error") or "")})
+                elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "cancel":
+                    self._reply(200, {"ok": queue.cancel(parts[1], body.get("error") or "")})
+                else:
+                    self._reply(404, {"error": "not found"})
+            except (KeyError, ValueError) as e:
+                self._reply(400, {"error": f"bad request: {e}"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), Handler)
+
+
+def get_job_queue():
+    """Return the configured job queue, or None when jobs run in-process.
+
+    JOB_QUEUE_URL selects the HTTP coordinator (JOB_QUEUE_TOKEN is sent if set);
+    otherwise JOB_QUEUE_DB selects a local SQLite queue.
+    """
+    url = os.getenv("JOB_QUEUE_URL")
+    if url:
+        return HttpJobQueue(url, token=os.getenv("JOB_QUEUE_TOKEN"))
+    db_path = os.getenv("JOB_QUEUE_DB")
+    if db_path:
+        return LocalJobQueue(db_path)
+    return None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the job queue HTTP coordinator")
+    parser.add_argument("--db", default=os.getenv("JOB_QUEUE_DB", "jobs.db"))
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="Interface to listen on; anything but loopback requires JOB_QUEUE_TOKEN")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    try:
+        server = make_coordinator(LocalJobQueue(args.db), args.host, args.port, token=os.getenv("JOB_QUEUE_TOKEN"))
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"📮 Job coordinator listening on {args.host}:{args.port} (db: {args.db})")
+    server.serve_forever()
@@ -6,18 +6,313 @@ Transcribes Korean video and creates bilingual subtitles using Whisper and Papag
 import urllib.request
 import urllib.parse
 import urllib.error
+import atexit
+import hashlib
 import json
+import os
+import tempfile
 import time
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Callable, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: usage file is then only safe for a single process
+    fcntl = None
+
+from segment_store import format_srt_timestamps, segment_timestamps
+
+
+TRANSLATION_ERROR_PREFIX = "[Translation error"
+
+
+def is_translation_error(text: str) -> bool:
+    """Return True if text is an error marker returned by PapagoTranslator."""
+    return text.startswith(TRANSLATION_ERROR_PREFIX)
+
+
+QUOTA_EXHAUSTED_ERROR = f"{TRANSLATION_ERROR_PREFIX}: daily Papago character quota reached]"
+# Usage days follow Korea Standard Time, when NAVER Cloud resets its daily counters
+QUOTA_UTC_OFFSET_HOURS = float(os.getenv("PAPAGO_QUOTA_UTC_OFFSET", "9"))
+USAGE_HISTORY_DAYS = 7
+
+
+def key_label(client_id: str) -> str:
+    """Short stable label for an API key, so usage files and metrics never contain the key itself."""
+    return hashlib.sha256(client_id.encode("utf-8")).hexdigest()[:8]
+
+
+def usage_day(now: Optional[float] = None) -> str:
+    """Quota day (YYYY-MM-DD) that the timestamp falls in."""
+    now = time.time() if now is None else now
+    return time.strftime("%Y-%m-%d", time.gmtime(now + QUOTA_UTC_OFFSET_HOURS * 3600))
+
+
+def seconds_until_reset(now: Optional[float] = None) -> float:
+    """Seconds until the next quota day starts."""
+    now = time.time() if now is None else now
+    return 86400 - (now + QUOTA_UTC_OFFSET_HOURS * 3600) % 86400
+
+
+class UsageMeter:
+    """Persistent count of characters sent to Papago, per API key and per quota day.
+
+    Counts are kept in memory and merged into a JSON file every flush_interval
+    seconds (under a file lock, then written atomically), so several processes
+    sharing the file add up their usage instead of overwriting each other.
+    daily_limit=0 means no limit is enforced; usage is still counted.
+    """
+
+    def __init__(self, path: str, daily_limit: int = 0, flush_interval: float = 5.0):
+        self.path = path
+        self.daily_limit = daily_limit
+        self.flush_interval = flush_interval
+        self._counts: Dict[str, Dict[str, int]] = self._read()
+        self._unflushed: Dict[str, Dict[str, int]] = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _read(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def used(self, client_id: str, day: Optional[str] = None) -> int:
+        # Pick up usage recorded by other processes sharing the file
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        with self._lock:
+            return self._counts.get(day or usage_day(), {}).get(key_label(client_id), 0)
+
+    def remaining(self, client_id: str) -> Optional[int]:
+        """Characters left today, or None when no daily limit is set."""
+        if not self.daily_limit:
+            return None
+        return max(0, self.daily_limit - self.used(client_id))
+
+    def allow(self, client_id: str, chars: int) -> bool:
+        remaining = self.remaining(client_id)
+        return remaining is None or chars <= remaining
+
+    def record(self, client_id: str, chars: int) -> None:
+        day, label = usage_day(), key_label(client_id)
+        with self._lock:
+            for counts in (self._counts, self._unflushed):
+                per_key = counts.setdefault(day, {})
+                per_key[label] = per_key.get(label, 0) + chars
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Merge unflushed counts into the usage file and reload the merged totals."""
+        with self._lock:
+            deltas, self._unflushed = self._unflushed, {}
+            self._last_flush = time.monotonic()
+            if not deltas:
+                self._counts = self._read()
+                return
+            directory = os.path.dirname(os.path.abspath(self.path))
+            try:
+                os.makedirs(directory, exist_ok=True)
+                with open(self.path + ".lock", "a") as lock_file:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    merged = self._read()
+                    for day, per_key in deltas.items():
+                        merged_day = merged.setdefault(day, {})
+                        for label, chars in per_key.items():
+                            merged_day[label] = merged_day.get(label, 0) + chars
+                    # Keep a week of history; older days only grow the file
+                    merged = {day: merged[day] for day in sorted(merged)[-USAGE_HISTORY_DAYS:]}
+                    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".papago_usage.")
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(merged, f)
+                    os.replace(tmp_path, self.path)
+                self._counts = merged
+            except OSError as e:
+                # Keep the deltas for the next attempt rather than losing usage
+                for day, per_key in deltas.items():
+                    pending_day = self._unflushed.setdefault(day, {})
+                    for label, chars in per_key.items():
+                        pending_day[label] = pending_day.get(label, 0) + chars
+                print(f"⚠️ Could not write Papago usage file {self.path}: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Today's usage per key label, plus the configured daily limit."""
+        day = usage_day()
+        self.flush()
+        with self._lock:
+            return {"day": day, "daily_limit": self.daily_limit, "used": dict(self._counts.get(day, {}))}
+
+
+_default_meter: Optional[UsageMeter] = None
+_default_meter_lock = threading.Lock()
+
+
+def get_usage_meter() -> UsageMeter:
+    """Return the process-wide usage meter.
+
+    PAPAGO_USAGE_FILE sets the counter file (share it between workers) and
+    PAPAGO_DAILY_CHAR_LIMIT the per-key daily character budget (0 = no limit).
+    """
+    global _default_meter
+    with _default_meter_lock:
+        if _default_meter is None:
+            _default_meter = UsageMeter(
+                path=os.getenv("PAPAGO_USAGE_FILE") or os.path.join(tempfile.gettempdir(), "papago_usage.json"),
+                daily_limit=int(os.getenv("PAPAGO_DAILY_CHAR_LIMIT", "0")),
+            )
+            atexit.register(_default_meter.flush)
+        return _default_meter
+
+
+class CircuitBreaker:
+    """Fails fast after repeated Papago errors instead of waiting on every request.
+
+    - closed: requests flow normally; consecutive failures are counted
+    - open: requests are rejected immediately for reset_timeout seconds
+    - half-open: one trial request is let through; success closes, failure re-opens
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            # Half-open: only one trial request at a time
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"⚡ Papago circuit opened after {self._failures} failure(s)")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(client_id: str) -> CircuitBreaker:
+    """Return the circuit breaker shared by all translators using client_id."""
+    with _breakers_lock:
+        breaker = _breakers.get(client_id)
+        if breaker is None:
+            breaker = _breakers[client_id] = CircuitBreaker()
+        return breaker
+
+
+class TranslationCache:
+    """Thread-safe LRU map of Korean text to its translation."""
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> Optional[str]:
+        with self._lock:
+            translated = self._entries.get(text)
+            if translated is not None:
+                self._entries.move_to_end(text)
+            return translated
+
+    def __setitem__(self, text: str, translated: str) -> None:
+        with self._lock:
+            self._entries[text] = translated
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __contains__(self, text: object) -> bool:
+        with self._lock:
+            return text in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_caches: Dict[str, TranslationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_translation_cache(client_id: str) -> TranslationCache:
+    """Return the translation cache shared by all translators using client_id."""
+    with _caches_lock:
+        cache = _caches.get(client_id)
+        if cache is None:
+            cache = _caches[client_id] = TranslationCache()
+        return cache
 
 
 class PapagoTranslator:
     """Handles translation using Papago API."""
     
-    def __init__(self, client_id: str, client_secret: str):
+    def __init__(
+        self,
+        client_id: str,
+        client_secret: str,
+        breaker: Optional[CircuitBreaker] = None,
+        meter: Optional[UsageMeter] = None,
+        cache: Optional[TranslationCache] = None,
+    ):
         self.client_id = client_id
         self.client_secret = client_secret
         self.url = "https://papago.apigw.ntruss.com/nmt/v1/translation"
+        # Breakers are shared per API key so every job sees an outage at once
+        self.breaker = breaker or get_breaker(client_id)
+        self.meter = meter or get_usage_meter()
+        # Requests before this time get the quota error without an API call (set for deferred jobs)
+        self.hold_until = 0.0
+        # Set once a request is refused because the daily character budget is spent
+        self.quota_limited = False
+        # Successful translations, shared per API key, so repeated lines (SRT, ASS, retries,
+        # other jobs) cost one API call
+        self._cache = cache if cache is not None else get_translation_cache(client_id)
     
     def translate_ko_to_en(self, text: str, timeout: int = 30) -> str:
         """Translate Korean text to English using Papago API.
@@ -28,9 +323,21 @@ class PapagoTranslator:
             
         Returns:
             Translated English text, or error message if translation fails
+            (immediately, without a request, while the circuit breaker is open,
+            the translator is on hold, or the daily character budget is spent)
         """
         if not text.strip():
             return ""
+        cached = self._cache.get(text)
+        if cached is not None:
+            return cached
+        if time.time() < self.hold_until:
+            return QUOTA_EXHAUSTED_ERROR
+        if not self.meter.allow(self.client_id, len(text)):
+            self.quota_limited = True
+            return QUOTA_EXHAUSTED_ERROR
+        if not self.breaker.allow():
+            return f"{TRANSLATION_ERROR_PREFIX}: Papago unavailable (circuit open)]"
         
         enc_text = urllib.parse.quote(text)
         data = f"source=ko&target=en&text={enc_text}"
@@ -43,16 +350,55 @@ class PapagoTranslator:
             with urllib.request.urlopen(req, data=data.encode("utf-8"), timeout=timeout) as res:
                 response = json.loads(res.read().decode("utf-8"))
                 if "message" in response and "result" in response["message"]:
-                    return response["message"]["result"]["translatedText"]
+                    translated = response["message"]["result"]["translatedText"]
+                    self.breaker.record_success()
+                    # Papago bills the characters of the source text
+                    self.meter.record(self.client_id, len(text))
+                    self._cache[text] = translated
+                    return translated
                 else:
+                    self.breaker.record_success()
                     return f"[Translation error: Unexpected response format]"
         except urllib.error.HTTPError as e:
             error_body = e.read().decode("utf-8") if hasattr(e, 'read') else str(e)
+            # Throttling and server errors mean the service is unhealthy; other 4xx are per-request
+            if e.code == 429 or e.code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
             return f"[Translation error: HTTP {e.code} - {error_body}]"
         except Exception as e:
+            # Timeouts and connection errors
+            self.breaker.record_failure()
             return f"[Translation error: {str(e)}]"
 
 
+def plan_translation(translator: PapagoTranslator, texts: Iterable[str]) -> Dict[str, Any]:
+    """Estimate the Papago characters a job will use, before translating anything.
+
+    Each distinct text is counted once and texts already in the translator's cache
+    are free, matching what translate_ko_to_en will actually send.
+
+    Returns:
+        Dict with chars, texts (distinct uncached), remaining (None without a daily
+        limit) and decision: "translate", "defer" (fits once the daily budget resets)
+        or "reject" (more than a whole day's budget)
+    """
+    # Stand-in translators (tests, benchmarks) have no cache or meter
+    cache = getattr(translator, "_cache", {})
+    meter = getattr(translator, "meter", None)
+    pending = {text for text in texts if text.strip() and text not in cache}
+    chars = sum(len(text) for text in pending)
+    remaining = meter.remaining(translator.client_id) if meter is not None else None
+    if remaining is None or chars <= remaining:
+        decision = "translate"
+    elif chars <= meter.daily_limit:
+        decision = "defer"
+    else:
+        decision = "reject"
+    return {"chars": chars, "texts": len(pending), "remaining": remaining, "decision": decision}
+
+
 def timestamp_to_srt(seconds: float) -> str:
     """Convert seconds to SRT timestamp format.
     
@@ -62,20 +408,25 @@ def timestamp_to_srt(seconds: float) -> str:
     Returns:
         SRT timestamp string (HH:MM:SS,mmm)
     """
-    h = int(seconds // 3600)
-    m = int((seconds % 3600) // 60)
-    s = int(seconds % 60)
-    ms = int((seconds * 1000) % 1000)
-    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+    return format_srt_timestamps((seconds,))[0]
 
 
 def segments_to_srt(
-    segments: List[Dict[str, Any]],
+    segments,
     translator: PapagoTranslator,
     show_progress: bool = False,
     progress_callback=None,
+    failed_indices: Optional[List[int]] = None,
+    cancel_token=None,
 ) -> str:
-    """Convert Whisper segments to bilingual SRT format with styling.
+    """Convert Whisper segments (list of dicts or a SegmentStore) to bilingual SRT format with styling.
+
+    If failed_indices is given, segments whose translation fails are written
+    Korean-only and their indices are appended to it (for a deferred retry);
+    otherwise the English line reads "[Translation failed]".
+
+    If cancel_token is given, cancel_token.raise_if_cancelled() runs before each
+    translation call so a cancelled job stops sending requests.
 
     Styling (as requested):
     - Font: NanumGothic for both languages
@@ -87,18 +438,25 @@ def segments_to_srt(
     lines: List[str] = []
     start_time = time.time()
     total_segments = len(segments)
+    # Format every timestamp in one batch instead of per segment
+    timestamps = segment_timestamps(segments, "srt")
     
     for i, seg in enumerate(segments):
-        start = seg["start"]
-        end = seg["end"]
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        start_srt = timestamps[2 * i]
+        end_srt = timestamps[2 * i + 1]
         text_ko_plain = seg["text"].strip()
         
         try:
             en_plain = translator.translate_ko_to_en(text_ko_plain)
-            if en_plain.startswith("[Translation error"):
+            if is_translation_error(en_plain):
                 en_plain = "[Translation failed]"
         except Exception as e:
             en_plain = f"[Translation error: {str(e)}]"
+        if failed_indices is not None and (en_plain == "[Translation failed]" or is_translation_error(en_plain)):
+            failed_indices.append(i)
+            en_plain = ""
 
         # Apply exact styling using SSA tags inside SRT lines
         # Note: many players/editors respect these inline tags
@@ -107,8 +465,9 @@ def segments_to_srt(
         en_line = en_plain
 
         # SRT requires a blank line between entries; emit Unix LF line endings
+        text_block = f"{ko_line}\n{en_line}" if en_line else ko_line
         lines.append(
-            f"{i+1}\n{timestamp_to_srt(start)} --> {timestamp_to_srt(end)}\n{ko_line}\n{en_line}\n\n"
+            f"{i+1}\n{start_srt} --> {end_srt}\n{text_block}\n\n"
         )
 
         # Safe progress updates (avoid evaluating Progress object)
@@ -135,3 +494,95 @@ def segments_to_srt(
         content = content.rstrip("\n") + "\n\n"
     return content
 
+
+
+class DeferredTranslationQueue:
+    """Retries failed segment translations in the background once Papago recovers.
+
+    Each submitted job holds the Korean texts that failed, keyed by segment index.
+    The worker retries them every poll_interval seconds; a round stops early while
+    the translator's circuit breaker is open or the daily quota is spent. A text that
+    keeps failing on its own (e.g. a 4xx for that request) is dropped after
+    max_attempts rounds so the rest of the job can finish. When no text is left,
+    on_complete receives {index: english}; jobs still incomplete after max_age
+    seconds (or their own max_age), or with nothing translated, are dropped and
+    on_abandon is called.
+    """
+
+    def __init__(self, poll_interval: float = 30.0, max_age: float = 6 * 3600, max_attempts: int = 5):
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.max_attempts = max_attempts
+        self._jobs: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        translator: PapagoTranslator,
+        texts: Dict[int, str],
+        on_complete: Callable[[Dict[int, str]], None],
+        on_abandon: Optional[Callable[[], None]] = None,
+        max_age: Optional[float] = None,
+    ) -> None:
+        with self._lock:
+            self._jobs.append({
+                "translator": translator,
+                "pending": dict(texts),
+                "done": {},
+                "attempts": {},
+                "on_complete": on_complete,
+                "on_abandon": on_abandon,
+                "submitted": time.monotonic(),
+                "max_age": self.max_age if max_age is None else max_age,
+            })
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="deferred-translation", daemon=True)
+                self._thread.start()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return sum(len(job["pending"]) for job in self._jobs)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                jobs = list(self._jobs)
+            if not jobs:
+                continue
+            for job in jobs:
+                self._retry(job)
+
+    def _retry(self, job: Dict[str, Any]) -> None:
+        translator = job["translator"]
+        breaker = getattr(translator, "breaker", None)
+        for index, text in list(job["pending"].items()):
+            en = translator.translate_ko_to_en(text)
+            if not is_translation_error(en):
+                job["done"][index] = en
+                del job["pending"][index]
+                continue
+            if en == QUOTA_EXHAUSTED_ERROR or (breaker is not None and breaker.state != CircuitBreaker.CLOSED):
+                # Papago is down or the quota is spent; every other text would fail too
+                break
+            # This request failed on its own; keep going with the others
+            attempts = job["attempts"][index] = job["attempts"].get(index, 0) + 1
+            if attempts >= self.max_attempts:
+                print(f"⚠️ Deferred translation gave up on segment {index}: {en}")
+                del job["pending"][index]
+
+        finished = not job["pending"]
+        expired = time.monotonic() - job["submitted"] > job["max_age"]
+        if not (finished or expired):
+            return
+        with self._lock:
+            self._jobs.remove(job)
+        try:
+            if finished and job["done"]:
+                print(f"🔁 Deferred translation filled {len(job['done'])} segment(s)")
+                job["on_complete"](job["done"])
+            elif job["on_abandon"] is not None:
+                job["on_abandon"]()
+        except Exception as e:
+            print(f"⚠️ Deferred translation callback failed: {e}")
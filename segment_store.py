@@ -0,0 +1,162 @@
+"""
+Segment Store
+Compact columnar storage for transcript segments. Whisper's segment dicts carry
+token lists, log-probs and other fields we never use; for multi-hour transcripts
+those dominate peak memory. SegmentStore keeps only start/end times (float arrays)
+and de-duplicated text, formats SRT/ASS timestamps in batch, and serializes to a
+small binary blob.
+"""
+
+import struct
+import sys
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Union
+
+
+_MAGIC = b"SEG1"
+_HEADER = struct.Struct("<4sI")
+
+
+class Segment:
+    """Lightweight segment record; supports seg["start"] access like Whisper's dicts."""
+
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start: float, end: float, text: str):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def get(self, key: str, default=None):
+        return getattr(self, key, default)
+
+    def __repr__(self) -> str:
+        return f"Segment({self.start!r}, {self.end!r}, {self.text!r})"
+
+
+class SegmentStore:
+    """Columnar segment list: start/end in array('d'), text interned per store."""
+
+    __slots__ = ("starts", "ends", "texts", "_intern")
+
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.texts: List[str] = []
+        self._intern: Dict[str, str] = {}
+
+    @classmethod
+    def from_whisper(cls, segments: Iterable[Dict[str, Any]]) -> "SegmentStore":
+        """Keep only start, end and stripped text from Whisper segment dicts."""
+        store = cls()
+        for seg in segments:
+            store.append(seg["start"], seg["end"], seg["text"].strip())
+        return store
+
+    def append(self, start: float, end: float, text: str) -> None:
+        # Repeated lines (common in long recordings) share one string object
+        text = self._intern.setdefault(text, text)
+        self.starts.append(start)
+        self.ends.append(end)
+        self.texts.append(text)
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> Segment:
+        return Segment(self.starts[index], self.ends[index], self.texts[index])
+
+    def __iter__(self) -> Iterator[Segment]:
+        for start, end, text in zip(self.starts, self.ends, self.texts):
+            yield Segment(start, end, text)
+
+    def joined_text(self, sep: str = "\n") -> str:
+        return sep.join(self.texts)
+
+    def srt_timestamps(self) -> List[str]:
+        """Return [start_0, end_0, start_1, end_1, ...] formatted as SRT timestamps."""
+        return _interleave(format_srt_timestamps(self.starts), format_srt_timestamps(self.ends))
+
+    def ass_timestamps(self) -> List[str]:
+        """Return [start_0, end_0, start_1, end_1, ...] formatted as ASS timestamps."""
+        return _interleave(format_ass_timestamps(self.starts), format_ass_timestamps(self.ends))
+
+    def to_bytes(self) -> bytes:
+        """Serialize as: header, little-endian start/end float64 arrays, NUL-separated UTF-8 text."""
+        starts, ends = array("d", self.starts), array("d", self.ends)
+        if sys.byteorder != "little":
+            starts.byteswap()
+            ends.byteswap()
+        return b"".join([
+            _HEADER.pack(_MAGIC, len(self)),
+            starts.tobytes(),
+            ends.tobytes(),
+            "\x00".join(self.texts).encode("utf-8"),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SegmentStore":
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized SegmentStore")
+        offset = _HEADER.size
+        width = count * 8
+        store = cls()
+        store.starts.frombytes(data[offset:offset + width])
+        store.ends.frombytes(data[offset + width:offset + 2 * width])
+        if sys.byteorder != "little":
+            store.starts.byteswap()
+            store.ends.byteswap()
+        texts = data[offset + 2 * width:].decode("utf-8").split("\x00") if count else []
+        store.texts = [store._intern.setdefault(t, t) for t in texts]
+        return store
+
+
+def _interleave(a: List[str], b: List[str]) -> List[str]:
+    out = [""] * (len(a) + len(b))
+    out[0::2] = a
+    out[1::2] = b
+    return out
+
+
+def _time_columns(values: Sequence[float], units_per_second: int) -> Iterator[tuple]:
+    """Split seconds into (hours, minutes, seconds, fraction) integer columns.
+
+    Rounds to the nearest unit once, so values like 4.35 s give 4.350 rather than
+    the 4.349 produced by truncating 4.35 * 1000 in floating point.
+    """
+    unit_hour = 3600 * units_per_second
+    unit_minute = 60 * units_per_second
+    for value in values:
+        total = int(value * units_per_second + 0.5)
+        h, rem = divmod(total, unit_hour)
+        m, rem = divmod(rem, unit_minute)
+        s, frac = divmod(rem, units_per_second)
+        yield h, m, s, frac
+
+
+def format_srt_timestamps(values: Sequence[float]) -> List[str]:
+    """Format many second values as SRT timestamps (HH:MM:SS,mmm) in one pass."""
+    return [f"{h:02d}:{m:02d}:{s:02d},{ms:03d}" for h, m, s, ms in _time_columns(values, 1000)]
+
+
+def format_ass_timestamps(values: Sequence[float]) -> List[str]:
+    """Format many second values as ASS timestamps (H:MM:SS.cc) in one pass."""
+    return [f"{h}:{m:02d}:{s:02d}.{cs:02d}" for h, m, s, cs in _time_columns(values, 100)]
+
+
+def segment_timestamps(segments: Union[SegmentStore, Sequence[Any]], kind: str = "srt") -> List[str]:
+    """Batch-format timestamps for a SegmentStore or a list of Whisper-style dicts.
+
+    Returns [start_0, end_0, start_1, end_1, ...].
+    """
+    if isinstance(segments, SegmentStore):
+        return segments.srt_timestamps() if kind == "srt" else segments.ass_timestamps()
+    formatter = format_srt_timestamps if kind == "srt" else format_ass_timestamps
+    return _interleave(formatter([seg["start"] for seg in segments]), formatter([seg["end"] for seg in segments]))
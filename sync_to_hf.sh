@@ -38,6 +38,12 @@ fi
 FILES_TO_SYNC=(
     "app.py"
     "papago_translation.py"
+    "artifact_store.py"
+    "warmup.py"
+    "job_queue.py"
+    "segment_store.py"
+    "cancellation.py"
+    "admission.py"
     "requirements_hf.txt"
     "README_HF.md"
     "packages.txt"
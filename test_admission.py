@@ -0,0 +1,158 @@
+"""
+Unit tests for memory admission control (RSS is injected, so nothing depends on this machine).
+"""
+
+import threading
+import time
+
+import pytest
+
+import admission
+from admission import MB, RENDER_ONLY, AdmissionController
+from cancellation import CancelToken, JobCancelled
+
+
+class FakeMemory:
+    """Stand-in for current_rss_bytes with a settable value."""
+
+    def __init__(self, rss):
+        self.rss = rss
+
+    def __call__(self):
+        return self.rss
+
+
+def estimate(mb):
+    return {"raw": mb * MB, "bytes": mb * MB}
+
+
+@pytest.fixture
+def memory():
+    return FakeMemory(100 * MB)
+
+
+@pytest.fixture
+def controller(memory):
+    return AdmissionController(budget_bytes=1000 * MB, rss_fn=memory)
+
+
+def admit_in_thread(controller, job_id, mb, **kwargs):
+    """Start admit() in a thread; returns (thread, outcome dict with "ticket" or "error")."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["ticket"] = controller.admit(job_id, "small", estimate(mb), **kwargs)
+        except JobCancelled as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def test_estimate_is_the_larger_stage_and_grows_with_media():
+    controller = AdmissionController(budget_bytes=1000 * MB, rss_fn=FakeMemory(0))
+    short = controller.estimate("tiny", 60)
+    long = controller.estimate("tiny", 3600)
+    assert long["bytes"] > short["bytes"]
+    assert controller.estimate("tiny", 60, model_resident=True)["bytes"] < short["bytes"]
+    # A 4K render outweighs transcription with the tiny model
+    assert controller.estimate("tiny", 60, 3840, 2160)["bytes"] > short["bytes"]
+
+
+def test_render_only_estimate_skips_whisper():
+    controller = AdmissionController(budget_bytes=1000 * MB, rss_fn=FakeMemory(0))
+    assert controller.estimate(RENDER_ONLY, 3600)["bytes"] == 0
+    assert controller.estimate(RENDER_ONLY, 3600, 1280, 720)["bytes"] == (
+        1280 * 720 * 1.5 * admission.FFMPEG_FRAMES_BUFFERED + admission.FFMPEG_BASE_BYTES
+    )
+
+
+def test_jobs_that_fit_are_admitted_together(controller):
+    first = controller.admit("job_a", "small", estimate(400))
+    second = controller.admit("job_b", "small", estimate(400))
+    assert [t["job"] for t in controller.snapshot()["running"]] == ["job_a", "job_b"]
+    assert first.solo is False
+    assert second.solo is False
+
+
+def test_oversized_job_runs_alone(controller):
+    ticket = controller.admit("job_a", "large-v3", estimate(5000))
+    assert ticket.solo
+
+
+def test_job_waits_until_memory_is_released(controller):
+    first = controller.admit("job_a", "small", estimate(600))
+    reasons = []
+    thread, outcome = admit_in_thread(controller, "job_b", 600, on_wait=reasons.append)
+    time.sleep(0.2)
+    assert "ticket" not in outcome
+    assert controller.snapshot()["waiting"] == 1
+    assert reasons and reasons[0].startswith("⏳ Waiting for memory")
+    controller.release(first)
+    thread.join(timeout=5)
+    assert outcome["ticket"].job_id == "job_b"
+
+
+def test_live_rss_above_reservations_blocks_admission(controller, memory):
+    controller.admit("job_a", "small", estimate(100))
+    # The running job already uses far more than it reserved
+    memory.rss = 900 * MB
+    thread, outcome = admit_in_thread(controller, "job_b", 200)
+    time.sleep(0.2)
+    assert "ticket" not in outcome
+    memory.rss = 300 * MB
+    thread.join(timeout=5)
+    assert "ticket" in outcome
+
+
+def test_cancelled_job_stops_waiting(controller):
+    controller.admit("job_a", "small", estimate(900))
+    token = CancelToken()
+    thread, outcome = admit_in_thread(controller, "job_b", 500, cancel_token=token)
+    time.sleep(0.1)
+    token.cancel("browser tab closed")
+    thread.join(timeout=5)
+    assert isinstance(outcome["error"], JobCancelled)
+    assert controller.snapshot()["waiting"] == 0
+
+
+def test_release_of_none_is_a_no_op(controller):
+    controller.release(None)
+
+
+def test_solo_run_corrects_the_model_estimate(controller):
+    ticket = controller.admit("job_a", "small", estimate(400))
+    ticket.peak_rss = ticket.start_rss + 800 * MB
+    controller.release(ticket)
+    # measured/estimated = 2.0, blended 30% into the previous factor of 1.0
+    assert controller.snapshot()["correction_factors"] == {"small": 1.3}
+    assert controller.estimate("small", 60)["bytes"] == int(controller.estimate("small", 60)["raw"] * 1.3)
+
+
+def test_concurrent_runs_do_not_teach_the_estimate(controller):
+    first = controller.admit("job_a", "small", estimate(300))
+    second = controller.admit("job_b", "small", estimate(300))
+    first.peak_rss = first.start_rss + 900 * MB
+    controller.release(first)
+    controller.release(second)
+    assert controller.snapshot()["correction_factors"] == {}
+
+
+def test_correction_ratio_is_clamped(controller):
+    ticket = controller.admit("job_a", "small", estimate(100))
+    ticket.peak_rss = ticket.start_rss + 10000 * MB
+    controller.release(ticket)
+    assert controller.snapshot()["correction_factors"] == {"small": round(0.7 + 0.3 * 3.0, 3)}
+
+
+def test_sampler_records_peak_rss(controller, memory, monkeypatch):
+    monkeypatch.setattr(admission, "SAMPLE_INTERVAL", 0.01)
+    ticket = controller.admit("job_a", "small", estimate(400))
+    memory.rss = 700 * MB
+    time.sleep(0.1)
+    memory.rss = 200 * MB
+    time.sleep(0.05)
+    assert ticket.peak_rss == 700 * MB
+    controller.release(ticket)
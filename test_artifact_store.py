@@ -0,0 +1,173 @@
+"""
+Unit tests for the artifact store: quota/LRU eviction, TTL sweep, active markers and atomic writes.
+"""
+
+import os
+import time
+
+import pytest
+
+from artifact_store import ACTIVE_MARKER_PREFIX, ACTIVE_MARKER_TTL, ArtifactStore, is_plain_name
+
+
+QUOTA = 1000
+
+
+@pytest.fixture
+def store(tmp_path):
+    # Jobs are set up under an unlimited quota (release() enforces it); tests apply QUOTA themselves
+    return ArtifactStore(root=str(tmp_path / "artifacts"), quota_bytes=10 ** 12, ttl_seconds=3600)
+
+
+def make_job(store, size, age=0.0, release=True):
+    """Create a job holding `size` bytes whose last access was `age` seconds ago."""
+    job_id = store.new_job()
+    with open(store.path(job_id, "data.bin"), "wb") as f:
+        f.write(b"x" * size)
+    if release:
+        store.release(job_id)
+    stamp = time.time() - age
+    os.utime(store.job_dir(job_id), (stamp, stamp))
+    return job_id
+
+
+def add_marker(store, job_id, name, age=0.0):
+    """Add another process's active marker to a job, last refreshed `age` seconds ago."""
+    job_dir = store.job_dir(job_id)
+    last_access = os.path.getmtime(job_dir)
+    marker = os.path.join(job_dir, f"{ACTIVE_MARKER_PREFIX}{name}")
+    open(marker, "w").close()
+    stamp = time.time() - age
+    os.utime(marker, (stamp, stamp))
+    # Creating the file bumps the directory mtime; keep the job's last access as it was
+    os.utime(job_dir, (last_access, last_access))
+
+
+@pytest.mark.parametrize("name, plain", [
+    ("subtitles_1.srt", True),
+    ("", False),
+    (".", False),
+    ("..", False),
+    (".active-host-1", False),
+    ("a/b", False),
+    ("a\\b", False),
+])
+def test_is_plain_name(name, plain):
+    assert is_plain_name(name) is plain
+
+
+def test_paths_cannot_leave_the_store(store):
+    job_id = store.new_job()
+    with pytest.raises(ValueError):
+        store.path(job_id, "../escape.srt")
+    with pytest.raises(ValueError):
+        store.job_dir("..")
+
+
+def test_quota_evicts_least_recently_used_first(store):
+    oldest = make_job(store, 400, age=300)
+    middle = make_job(store, 400, age=200)
+    newest = make_job(store, 400, age=100)
+    store.quota_bytes = QUOTA
+    assert store.enforce_quota() == [oldest]
+    assert not os.path.exists(store.job_dir(oldest))
+    assert os.path.exists(store.job_dir(middle))
+    assert os.path.exists(store.job_dir(newest))
+
+
+def test_quota_skips_jobs_in_use(store):
+    running = make_job(store, 600, age=300, release=False)
+    finished = make_job(store, 600, age=100)
+    store.quota_bytes = QUOTA
+    assert store.enforce_quota() == [finished]
+    assert os.path.exists(store.job_dir(running))
+
+
+def test_release_enforces_quota(store):
+    old = make_job(store, 600, age=300)
+    store.quota_bytes = QUOTA
+    make_job(store, 600)
+    assert not os.path.exists(store.job_dir(old))
+
+
+def test_nested_acquire_needs_matching_release(store):
+    job_id = make_job(store, 10, release=False)
+    store.acquire(job_id)
+    store.release(job_id)
+    assert store.is_active(job_id)
+    store.release(job_id)
+    assert not store.is_active(job_id)
+
+
+def test_sweep_removes_only_expired_inactive_jobs(store):
+    expired = make_job(store, 10, age=7200)
+    running = make_job(store, 10, age=7200, release=False)
+    fresh = make_job(store, 10, age=60)
+    assert store.sweep_expired() == [expired]
+    assert os.path.exists(store.job_dir(running))
+    assert os.path.exists(store.job_dir(fresh))
+
+
+def test_marker_is_written_on_acquire_and_removed_on_release(store):
+    job_id = store.new_job()
+    markers = [n for n in os.listdir(store.job_dir(job_id)) if n.startswith(ACTIVE_MARKER_PREFIX)]
+    assert len(markers) == 1
+    store.release(job_id)
+    assert not [n for n in os.listdir(store.job_dir(job_id)) if n.startswith(ACTIVE_MARKER_PREFIX)]
+
+
+def test_fresh_marker_from_another_process_blocks_eviction(store):
+    job_id = make_job(store, 1200, age=7200)
+    add_marker(store, job_id, "otherhost-4242", age=10)
+    # A second store on the same root stands in for another process
+    other = ArtifactStore(root=store.root, quota_bytes=QUOTA, ttl_seconds=3600)
+    assert other.is_active(job_id)
+    assert other.enforce_quota() == []
+    assert other.sweep_expired() == []
+
+
+def test_stale_marker_from_dead_process_is_ignored(store):
+    job_id = make_job(store, 1200, age=7200)
+    add_marker(store, job_id, "otherhost-4242", age=ACTIVE_MARKER_TTL + 60)
+    assert not store.is_active(job_id)
+    assert store.sweep_expired() == [job_id]
+
+
+def test_refresh_active_keeps_markers_fresh(store):
+    job_id = store.new_job()
+    marker = os.path.join(store.job_dir(job_id), store._marker_name)
+    stale = time.time() - ACTIVE_MARKER_TTL - 60
+    os.utime(marker, (stale, stale))
+    store.refresh_active()
+    assert os.path.getmtime(marker) > stale + 60
+
+
+def test_atomic_path_renames_on_success(store):
+    job_id = store.new_job()
+    final = store.path(job_id, "out.srt")
+    with store.atomic_path(final) as tmp_path:
+        assert tmp_path.endswith(".srt")
+        with open(tmp_path, "w") as f:
+            f.write("done")
+    with open(final) as f:
+        assert f.read() == "done"
+    assert set(os.listdir(store.job_dir(job_id))) == {store._marker_name, "out.srt"}
+
+
+def test_atomic_path_cleans_up_on_error(store):
+    job_id = store.new_job()
+    final = store.path(job_id, "out.mp4")
+    with pytest.raises(RuntimeError):
+        with store.atomic_path(final) as tmp_path:
+            with open(tmp_path, "w") as f:
+                f.write("partial")
+            raise RuntimeError("ffmpeg failed")
+    assert not os.path.exists(final)
+    assert set(os.listdir(store.job_dir(job_id))) == {store._marker_name}
+
+
+def test_write_text_is_atomic_and_complete(store):
+    job_id = store.new_job()
+    path = store.write_text(store.path(job_id, "subs.srt"), "1\n안녕하세요\n", newline="\n")
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "1\n안녕하세요\n"
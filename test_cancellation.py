@@ -0,0 +1,133 @@
+"""
+Unit tests for cooperative job cancellation: tokens, child tokens, process cleanup and sessions.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from cancellation import (
+    CancelToken,
+    JobCancelled,
+    cancel_session,
+    finish_session_job,
+    start_session_job,
+)
+
+
+@pytest.fixture
+def sleeper():
+    """A child process that runs until it is killed."""
+    proc = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    yield proc
+    if proc.poll() is None:
+        proc.kill()
+    proc.wait()
+
+
+def test_cancel_sets_flag_and_reason():
+    token = CancelToken()
+    token.raise_if_cancelled()
+    token.cancel("superseded")
+    assert token.cancelled
+    assert token.is_set()
+    with pytest.raises(JobCancelled, match="superseded"):
+        token.raise_if_cancelled()
+
+
+def test_first_reason_wins():
+    token = CancelToken()
+    token.cancel("tab closed")
+    token.cancel("superseded")
+    assert token.reason == "tab closed"
+
+
+def test_parent_cancels_children_but_not_the_reverse():
+    parent = CancelToken()
+    render = parent.child()
+    render.cancel("full-quality render skipped")
+    assert not parent.cancelled
+    other = parent.child()
+    parent.cancel("job abandoned")
+    assert other.cancelled
+    assert other.reason == "job abandoned"
+
+
+def test_child_of_cancelled_parent_starts_cancelled():
+    parent = CancelToken()
+    parent.cancel("job abandoned")
+    assert parent.child().cancelled
+
+
+def test_cancel_kills_registered_process(sleeper):
+    token = CancelToken()
+    token.register_process(sleeper)
+    token.child().cancel("child only")
+    assert sleeper.poll() is None
+    token.cancel("job abandoned")
+    assert sleeper.wait(timeout=5) is not None
+
+
+def test_registering_after_cancel_kills_immediately(sleeper):
+    token = CancelToken()
+    token.cancel("job abandoned")
+    token.register_process(sleeper)
+    assert sleeper.wait(timeout=5) is not None
+
+
+def test_unregistered_process_survives_cancel(sleeper):
+    token = CancelToken()
+    token.register_process(sleeper)
+    token.unregister_process(sleeper)
+    token.cancel("job abandoned")
+    assert sleeper.poll() is None
+
+
+def test_on_cancel_callbacks_run_once_with_reason():
+    token = CancelToken()
+    reasons = []
+    token.on_cancel(reasons.append)
+    token.cancel("tab closed")
+    token.cancel("again")
+    token.on_cancel(reasons.append)
+    assert reasons == ["tab closed", "tab closed"]
+
+
+def test_failing_callback_does_not_stop_cancellation(sleeper):
+    token = CancelToken()
+    token.on_cancel(lambda reason: 1 / 0)
+    token.register_process(sleeper)
+    token.cancel("job abandoned")
+    assert sleeper.wait(timeout=5) is not None
+
+
+def test_new_session_job_supersedes_previous():
+    first = start_session_job("session-a")
+    second = start_session_job("session-a")
+    assert first.cancelled
+    assert first.reason == "superseded by a new job"
+    assert not second.cancelled
+    assert cancel_session("session-a", "browser tab closed")
+    assert second.reason == "browser tab closed"
+
+
+def test_finished_job_is_not_cancelled_by_session_close():
+    token = start_session_job("session-b")
+    finish_session_job("session-b", token)
+    assert not cancel_session("session-b")
+    assert not token.cancelled
+
+
+def test_finishing_a_superseded_job_keeps_the_new_one():
+    old = start_session_job("session-c")
+    new = start_session_job("session-c")
+    finish_session_job("session-c", old)
+    assert cancel_session("session-c")
+    assert new.cancelled
+
+
+def test_jobs_without_session_are_not_tracked():
+    token = start_session_job(None)
+    assert not cancel_session(None)
+    assert not token.cancelled
@@ -0,0 +1,74 @@
+"""
+Unit tests for ffmpeg `-progress` parsing and duration-scaled ffmpeg timeouts.
+"""
+
+import io
+
+import pytest
+
+pytest.importorskip("gradio")
+
+import app
+from app import _FFmpegProgress, ffmpeg_timeouts
+
+
+def progress_block(**fields):
+    lines = [f"{key}={value}" for key, value in fields.items()]
+    return "\n".join(lines) + "\n"
+
+
+def test_block_updates_progress_once():
+    progress = _FFmpegProgress()
+    progress.read_progress(io.StringIO(progress_block(
+        frame=48, fps="23.98", out_time_us=2_000_000, out_time_ms=2_000_000, speed=" 1.5x", progress="continue",
+    )))
+    assert progress.take_update() == (2.0, 48, 23.98, "1.5x")
+    assert progress.take_update() is None
+
+
+def test_out_time_ms_is_microseconds():
+    progress = _FFmpegProgress()
+    progress.read_progress(io.StringIO(progress_block(out_time_ms=3_500_000, progress="continue")))
+    assert progress.out_time == 3.5
+
+
+def test_unknown_or_backwards_time_keeps_last_value():
+    progress = _FFmpegProgress()
+    progress.read_progress(io.StringIO(progress_block(out_time_us=5_000_000, progress="continue")))
+    advanced_at = progress.last_advance
+    progress.read_progress(io.StringIO(
+        progress_block(out_time_us="N/A", progress="continue")
+        + progress_block(out_time_us=1_000_000, progress="end")
+    ))
+    assert progress.out_time == 5.0
+    # Only forward progress resets the stall timer
+    assert progress.last_advance == advanced_at
+
+
+def test_incomplete_block_and_noise_are_ignored():
+    progress = _FFmpegProgress()
+    progress.read_progress(io.StringIO("not a key value line\nframe=10\nfps=not-a-number\n"))
+    assert progress.take_update() is None
+    assert progress.frame == 0
+
+
+def test_stderr_tail_is_bounded():
+    progress = _FFmpegProgress()
+    progress.read_stderr(io.StringIO("".join(f"line {i}\n" for i in range(app.FFMPEG_STDERR_TAIL_LINES + 50))))
+    assert len(progress.stderr_tail) == app.FFMPEG_STDERR_TAIL_LINES
+    assert progress.stderr_tail[-1] == f"line {app.FFMPEG_STDERR_TAIL_LINES + 49}"
+
+
+@pytest.mark.parametrize("duration", [None, 0, -1])
+def test_timeouts_for_unknown_duration(duration):
+    assert ffmpeg_timeouts(duration) == (app.FFMPEG_STALL_TIMEOUT_MIN, app.FFMPEG_UNKNOWN_DURATION_TIMEOUT)
+
+
+def test_timeouts_have_minimums_for_short_media():
+    assert ffmpeg_timeouts(5) == (app.FFMPEG_STALL_TIMEOUT_MIN, app.FFMPEG_OVERALL_TIMEOUT_MIN)
+
+
+def test_timeouts_scale_with_long_media():
+    stall, overall = ffmpeg_timeouts(2 * 3600)
+    assert stall == 2 * 3600 * 0.05
+    assert overall == 2 * 3600 * app.FFMPEG_REALTIME_FACTOR
@@ -0,0 +1,129 @@
+"""
+Unit tests for the SQLite job queue: leases, expiry, requeue, cancellation and payload validation.
+"""
+
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, LEASED, QUEUED, LocalJobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return LocalJobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+
+
+def expire_lease(queue, job_id):
+    """Backdate a job's lease so it counts as expired."""
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ?", (time.time() - 1, job_id))
+
+
+def test_claim_leases_oldest_job(queue):
+    queue.submit("job_a", {"media": "input.mp4"})
+    queue.submit("job_b", {"media": "input.mp4"})
+    job = queue.claim("worker-1", lease_seconds=60)
+    assert job["id"] == "job_a"
+    assert job["status"] == LEASED
+    assert job["worker"] == "worker-1"
+    assert job["attempts"] == 1
+
+
+def test_claim_returns_none_when_empty(queue):
+    assert queue.claim("worker-1") is None
+
+
+def test_leased_job_is_not_claimed_twice(queue):
+    queue.submit("job_a", {})
+    queue.claim("worker-1", lease_seconds=60)
+    assert queue.claim("worker-2", lease_seconds=60) is None
+
+
+def test_expired_lease_is_requeued_for_another_worker(queue):
+    queue.submit("job_a", {})
+    queue.claim("worker-1", lease_seconds=60)
+    expire_lease(queue, "job_a")
+    job = queue.claim("worker-2", lease_seconds=60)
+    assert job["id"] == "job_a"
+    assert job["worker"] == "worker-2"
+    assert job["attempts"] == 2
+    # The old owner can no longer heartbeat or finish it
+    assert not queue.heartbeat("job_a", "worker-1")
+    assert not queue.complete("job_a", "worker-1", {})
+
+
+def test_get_reclaims_expired_lease(queue):
+    queue.submit("job_a", {})
+    queue.claim("worker-1", lease_seconds=60)
+    expire_lease(queue, "job_a")
+    job = queue.get("job_a")
+    assert job["status"] == QUEUED
+    assert job["worker"] is None
+
+
+def test_job_fails_after_max_attempts(queue):
+    queue.submit("job_a", {})
+    for worker in ("worker-1", "worker-2"):
+        queue.claim(worker, lease_seconds=60)
+        expire_lease(queue, "job_a")
+    job = queue.get("job_a")
+    assert job["status"] == FAILED
+    assert "expired" in job["error"]
+    assert queue.claim("worker-3") is None
+
+
+def test_heartbeat_extends_lease_and_records_progress(queue):
+    queue.submit("job_a", {})
+    queue.claim("worker-1", lease_seconds=1)
+    assert queue.heartbeat("job_a", "worker-1", lease_seconds=60, progress=0.5, desc="Transcribing",
+                           result={"srt": None})
+    job = queue.get("job_a")
+    assert job["lease_expires"] > time.time() + 30
+    assert job["progress"] == 0.5
+    assert job["desc"] == "Transcribing"
+    assert job["result"] == {"srt": None}
+
+
+def test_complete_and_fail(queue):
+    queue.submit("job_a", {})
+    queue.submit("job_b", {})
+    queue.claim("worker-1")
+    queue.claim("worker-1")
+    assert queue.complete("job_a", "worker-1", {"srt": {"value": "job_a/x.srt", "label": None}})
+    assert queue.fail("job_b", "worker-1", "boom")
+    assert queue.get("job_a")["status"] == DONE
+    assert queue.get("job_b")["error"] == "boom"
+
+
+def test_abandon_only_fails_unclaimed_jobs(queue):
+    queue.submit("job_a", {})
+    queue.submit("job_b", {})
+    queue.claim("worker-1")
+    assert not queue.abandon("job_a", "no worker")
+    assert queue.abandon("job_b", "no worker")
+    assert queue.get("job_b")["status"] == FAILED
+
+
+def test_cancel_stops_running_and_queued_jobs(queue):
+    queue.submit("job_a", {})
+    queue.submit("job_b", {})
+    queue.claim("worker-1")
+    assert queue.cancel("job_a", "Cancelled: tab closed")
+    assert queue.cancel("job_b", "Cancelled: tab closed")
+    # The worker's next heartbeat fails, which cancels its pipeline
+    assert not queue.heartbeat("job_a", "worker-1")
+    assert queue.get("job_a")["error"] == "Cancelled: tab closed"
+    assert queue.claim("worker-2") is None
+    assert not queue.cancel("job_a", "again")
+
+
+@pytest.mark.parametrize("job_id, payload", [
+    ("../escape", {}),
+    ("job_a", {"media": "../../etc/passwd"}),
+    ("job_a", {"media": ".active-host-1"}),
+    ("job_a", {"url": "file:///etc/passwd"}),
+])
+def test_submit_rejects_unsafe_payloads(queue, job_id, payload):
+    with pytest.raises(ValueError):
+        queue.submit(job_id, payload)
@@ -0,0 +1,259 @@
+"""
+Unit tests for papago_translation (no network: Papago responses are faked).
+"""
+
+import io
+import json
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import papago_translation
+from papago_translation import (
+    QUOTA_EXHAUSTED_ERROR,
+    CircuitBreaker,
+    DeferredTranslationQueue,
+    PapagoTranslator,
+    TranslationCache,
+    UsageMeter,
+    key_label,
+    plan_translation,
+    usage_day,
+)
+
+
+# ----------------------------------------------------------------------
+# CircuitBreaker
+# ----------------------------------------------------------------------
+def test_breaker_stays_closed_below_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_breaker_opens_at_threshold_and_rejects():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_allows_single_trial():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+    # Only one trial request while it is in flight
+    assert not breaker.allow()
+
+
+@pytest.mark.parametrize("succeeds, expected", [(True, CircuitBreaker.CLOSED), (False, CircuitBreaker.OPEN)])
+def test_breaker_trial_outcome(succeeds, expected):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow()
+    if succeeds:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+    assert breaker.state == expected
+    assert breaker.allow() is succeeds
+
+
+# ----------------------------------------------------------------------
+# Usage metering and pre-flight planning
+# ----------------------------------------------------------------------
+class _FakeResponse(io.BytesIO):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def papago_calls(monkeypatch):
+    """Fake Papago: every request succeeds with "en:<text>"; returns the list of sent texts."""
+    calls = []
+
+    def fake_urlopen(req, data=None, timeout=None):
+        text = papago_translation.urllib.parse.unquote(data.decode("utf-8").split("text=", 1)[1])
+        calls.append(text)
+        body = {"message": {"result": {"translatedText": f"en:{text}"}}}
+        return _FakeResponse(json.dumps(body).encode("utf-8"))
+
+    monkeypatch.setattr(papago_translation.urllib.request, "urlopen", fake_urlopen)
+    return calls
+
+
+@pytest.fixture
+def usage_path(tmp_path):
+    return str(tmp_path / "papago_usage.json")
+
+
+def make_translator(meter, cache=None):
+    return PapagoTranslator("client-id", "secret", breaker=CircuitBreaker(), meter=meter,
+                            cache=cache if cache is not None else TranslationCache())
+
+
+def test_meter_counts_only_successful_uncached_requests(usage_path, papago_calls):
+    meter = UsageMeter(usage_path, flush_interval=0)
+    translator = make_translator(meter)
+    assert translator.translate_ko_to_en("안녕하세요") == "en:안녕하세요"
+    assert translator.translate_ko_to_en("안녕하세요") == "en:안녕하세요"
+    assert papago_calls == ["안녕하세요"]
+    assert meter.used("client-id") == len("안녕하세요")
+
+
+def test_meter_file_stores_key_label_not_key(usage_path):
+    meter = UsageMeter(usage_path, flush_interval=0)
+    meter.record("client-id", 7)
+    with open(usage_path, encoding="utf-8") as f:
+        data = json.load(f)
+    assert data == {usage_day(): {key_label("client-id"): 7}}
+
+
+def test_meters_sharing_a_file_merge_usage(usage_path):
+    first = UsageMeter(usage_path, flush_interval=0)
+    second = UsageMeter(usage_path, flush_interval=0)
+    first.record("client-id", 5)
+    second.record("client-id", 3)
+    assert first.used("client-id") == 8
+    assert second.used("client-id") == 8
+
+
+def test_meter_merges_usage_from_another_process(usage_path):
+    meter = UsageMeter(usage_path, flush_interval=0)
+    meter.record("client-id", 5)
+    script = (
+        "import sys; from papago_translation import UsageMeter; "
+        "UsageMeter(sys.argv[1], flush_interval=0).record('client-id', 11)"
+    )
+    subprocess.run([sys.executable, "-c", script, usage_path], check=True,
+                   cwd=papago_translation.os.path.dirname(papago_translation.__file__))
+    assert meter.used("client-id") == 16
+
+
+def test_translator_refuses_requests_past_daily_limit(usage_path, papago_calls):
+    meter = UsageMeter(usage_path, daily_limit=6, flush_interval=0)
+    translator = make_translator(meter)
+    translator.translate_ko_to_en("안녕하세요")
+    assert translator.translate_ko_to_en("반갑습니다") == QUOTA_EXHAUSTED_ERROR
+    assert translator.quota_limited
+    assert papago_calls == ["안녕하세요"]
+
+
+def test_translator_on_hold_sends_nothing(usage_path, papago_calls):
+    translator = make_translator(UsageMeter(usage_path, flush_interval=0))
+    translator.hold_until = time.time() + 60
+    assert translator.translate_ko_to_en("안녕하세요") == QUOTA_EXHAUSTED_ERROR
+    assert papago_calls == []
+
+
+@pytest.mark.parametrize("daily_limit, used, decision", [
+    (0, 0, "translate"),
+    (100, 0, "translate"),
+    (100, 95, "defer"),
+    (8, 0, "reject"),
+])
+def test_plan_translation_decisions(usage_path, daily_limit, used, decision):
+    meter = UsageMeter(usage_path, daily_limit=daily_limit, flush_interval=0)
+    if used:
+        meter.record("client-id", used)
+    plan = plan_translation(make_translator(meter), ["안녕하세요", "반갑습니다", "안녕하세요", "  "])
+    assert plan["chars"] == 10
+    assert plan["texts"] == 2
+    assert plan["decision"] == decision
+
+
+def test_plan_translation_skips_texts_cached_by_earlier_jobs(usage_path, papago_calls):
+    meter = UsageMeter(usage_path, flush_interval=0)
+    cache = TranslationCache()
+    make_translator(meter, cache).translate_ko_to_en("안녕하세요")
+    plan = plan_translation(make_translator(meter, cache), ["안녕하세요", "반갑습니다"])
+    assert plan["texts"] == 1
+    assert plan["chars"] == len("반갑습니다")
+
+
+def test_translators_share_cache_per_key():
+    first = PapagoTranslator("shared-key", "secret", breaker=CircuitBreaker())
+    second = PapagoTranslator("shared-key", "secret", breaker=CircuitBreaker())
+    assert first._cache is second._cache
+
+
+# ----------------------------------------------------------------------
+# DeferredTranslationQueue
+# ----------------------------------------------------------------------
+class StandInTranslator:
+    """Translates to "en:<text>"; texts in `failing` return a per-request error."""
+
+    def __init__(self, failing=(), breaker=None):
+        self.failing = set(failing)
+        self.breaker = breaker or CircuitBreaker()
+        self.calls = []
+
+    def translate_ko_to_en(self, text):
+        self.calls.append(text)
+        if text in self.failing:
+            return "[Translation error: HTTP 400 - bad request]"
+        return f"en:{text}"
+
+
+def run_deferred(translator, texts, **queue_kwargs):
+    """Submit texts and wait for the job to finish; returns (completed translations, abandoned)."""
+    queue = DeferredTranslationQueue(poll_interval=0.01, **queue_kwargs)
+    finished = threading.Event()
+    outcome = {"done": None, "abandoned": False}
+
+    def on_complete(done):
+        outcome["done"] = done
+        finished.set()
+
+    def on_abandon():
+        outcome["abandoned"] = True
+        finished.set()
+
+    queue.submit(translator, texts, on_complete, on_abandon=on_abandon)
+    assert finished.wait(5)
+    return outcome["done"], outcome["abandoned"]
+
+
+def test_deferred_failing_line_does_not_block_the_others():
+    translator = StandInTranslator(failing={"bad"})
+    done, abandoned = run_deferred(translator, {0: "bad", 1: "a", 2: "b"}, max_attempts=3)
+    assert done == {1: "en:a", 2: "en:b"}
+    assert not abandoned
+    assert translator.calls.count("bad") == 3
+    assert translator.calls.count("a") == 1
+
+
+def test_deferred_job_with_nothing_translated_is_abandoned():
+    done, abandoned = run_deferred(StandInTranslator(failing={"bad"}), {0: "bad"}, max_attempts=2)
+    assert done is None
+    assert abandoned
+
+
+def test_deferred_round_stops_while_circuit_is_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    translator = StandInTranslator(failing={"a", "b"}, breaker=breaker)
+    done, abandoned = run_deferred(translator, {0: "a", 1: "b"}, max_age=0.2)
+    assert abandoned
+    # Only the first text of each round is tried, and nothing is dropped as a per-request failure
+    assert "b" not in translator.calls
@@ -0,0 +1,77 @@
+"""
+Unit tests for the columnar SegmentStore and batch timestamp formatting.
+"""
+
+import pytest
+
+from segment_store import (
+    SegmentStore,
+    format_ass_timestamps,
+    format_srt_timestamps,
+    segment_timestamps,
+)
+
+
+WHISPER_SEGMENTS = [
+    {"id": 0, "start": 0.0, "end": 2.5, "text": " 안녕하세요", "tokens": [1, 2, 3], "avg_logprob": -0.2},
+    {"id": 1, "start": 2.5, "end": 4.35, "text": " 반갑습니다 ", "tokens": [4, 5], "avg_logprob": -0.3},
+    {"id": 2, "start": 3661.005, "end": 3662.0, "text": " 안녕하세요", "tokens": [6], "avg_logprob": -0.1},
+]
+
+
+def test_from_whisper_keeps_times_and_stripped_text():
+    store = SegmentStore.from_whisper(WHISPER_SEGMENTS)
+    assert len(store) == 3
+    assert store[1]["start"] == 2.5
+    assert store[1]["text"] == "반갑습니다"
+    assert [seg.text for seg in store] == ["안녕하세요", "반갑습니다", "안녕하세요"]
+    assert store.joined_text() == "안녕하세요\n반갑습니다\n안녕하세요"
+
+
+def test_repeated_text_is_interned():
+    store = SegmentStore.from_whisper(WHISPER_SEGMENTS)
+    assert store.texts[0] is store.texts[2]
+
+
+def test_segment_supports_dict_style_access():
+    seg = SegmentStore.from_whisper(WHISPER_SEGMENTS)[0]
+    assert seg.get("text") == "안녕하세요"
+    assert seg.get("tokens") is None
+    with pytest.raises(KeyError):
+        seg["tokens"]
+
+
+def test_bytes_round_trip():
+    store = SegmentStore.from_whisper(WHISPER_SEGMENTS)
+    restored = SegmentStore.from_bytes(store.to_bytes())
+    assert list(restored.starts) == list(store.starts)
+    assert list(restored.ends) == list(store.ends)
+    assert restored.texts == store.texts
+
+
+def test_empty_store_round_trip():
+    restored = SegmentStore.from_bytes(SegmentStore().to_bytes())
+    assert len(restored) == 0
+
+
+def test_from_bytes_rejects_other_data():
+    with pytest.raises(ValueError):
+        SegmentStore.from_bytes(b"XXXX\x00\x00\x00\x00")
+
+
+@pytest.mark.parametrize("seconds, srt, ass", [
+    (0.0, "00:00:00,000", "0:00:00.00"),
+    (4.35, "00:00:04,350", "0:00:04.35"),
+    (59.9999, "00:01:00,000", "0:01:00.00"),
+    (3661.005, "01:01:01,005", "1:01:01.01"),
+])
+def test_timestamps_round_to_nearest_unit(seconds, srt, ass):
+    assert format_srt_timestamps([seconds]) == [srt]
+    assert format_ass_timestamps([seconds]) == [ass]
+
+
+def test_segment_timestamps_match_for_store_and_dicts():
+    store = SegmentStore.from_whisper(WHISPER_SEGMENTS)
+    for kind in ("srt", "ass"):
+        assert segment_timestamps(store, kind) == segment_timestamps(WHISPER_SEGMENTS, kind)
+    assert segment_timestamps(store, "srt")[:4] == ["00:00:00,000", "00:00:02,500", "00:00:02,500", "00:00:04,350"]
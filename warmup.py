@@ -0,0 +1,194 @@
+"""
+Warm-up and Readiness
+Imports heavy dependencies (whisper, torch) lazily, warms the Whisper model in a
+background thread and records import timings for tracking cold-start regressions.
+
+Run `python warmup.py --profile` to print an import-time report for app.py.
+"""
+
+import importlib
+import importlib.util
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+
+_import_timings: Dict[str, float] = {}
+_models: Dict[str, Any] = {}
+_models_lock = threading.Lock()
+
+
+@contextmanager
+def import_timer(name: str):
+    """Record how long the wrapped import block takes, e.g. `with import_timer("gradio"): import gradio`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _import_timings[name] = time.perf_counter() - start
+
+
+def record_timing(name: str, seconds: float) -> None:
+    _import_timings[name] = seconds
+
+
+def import_report() -> List[Tuple[str, float]]:
+    """Return recorded (name, seconds) import timings, slowest first."""
+    return sorted(_import_timings.items(), key=lambda kv: kv[1], reverse=True)
+
+
+def format_import_report() -> str:
+    lines = ["⏱️ Import timings:"]
+    for name, seconds in import_report():
+        lines.append(f"  {name:<24} {seconds * 1000:8.1f} ms")
+    return "\n".join(lines)
+
+
+def whisper_available() -> bool:
+    """Check whether Whisper is installed without importing it (and torch)."""
+    return importlib.util.find_spec("whisper") is not None
+
+
+def get_whisper_model(model_name: str):
+    """Return a loaded Whisper model, importing whisper and loading weights on first use.
+
+    Models are cached for the lifetime of the process, so only the first job (or the
+    background warm-up) pays the load cost.
+    """
+    with _models_lock:
+        model = _models.get(model_name)
+        if model is None:
+            with import_timer("whisper"):
+                whisper = importlib.import_module("whisper")
+            start = time.perf_counter()
+            model = whisper.load_model(model_name)
+            record_timing(f"whisper.load_model({model_name})", time.perf_counter() - start)
+            _models[model_name] = model
+        return model
+
+
+def is_model_loaded(model_name: str) -> bool:
+    """True if the model's weights are already resident (counted in live RSS)."""
+    return model_name in _models
+
+
+class WarmupState:
+    """Tracks background warm-up so health checks can report readiness."""
+
+    COLD = "cold"
+    WARMING = "warming"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self):
+        self.status = self.COLD
+        self.model_name: Optional[str] = None
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.ready_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _set(self, **fields) -> None:
+        with self._lock:
+            for key, value in fields.items():
+                setattr(self, key, value)
+
+    @property
+    def ready(self) -> bool:
+        return self.status == self.READY
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            warm_seconds = None
+            if self.started_at is not None and self.ready_at is not None:
+                warm_seconds = round(self.ready_at - self.started_at, 3)
+            return {
+                "status": self.status,
+                "model": self.model_name,
+                "error": self.error,
+                "warmup_seconds": warm_seconds,
+            }
+
+
+state = WarmupState()
+
+
+def start_warmup(model_name: str) -> threading.Thread:
+    """Import Whisper and load model_name in a daemon thread."""
+    state._set(status=WarmupState.WARMING, model_name=model_name, error=None, started_at=time.time())
+
+    def _run():
+        try:
+            if not whisper_available():
+                raise ImportError("Whisper package not installed")
+            get_whisper_model(model_name)
+            state._set(status=WarmupState.READY, ready_at=time.time())
+            print(f"🔥 Whisper {model_name} warm ({state.snapshot()['warmup_seconds']}s)")
+        except Exception as e:
+            state._set(status=WarmupState.FAILED, error=str(e))
+            print(f"⚠️ Warm-up failed: {e}")
+
+    thread = threading.Thread(target=_run, name="whisper-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def health() -> Dict[str, Any]:
+    """Health payload: warm-up state plus recorded import timings."""
+    return {
+        "warmup": state.snapshot(),
+        "imports_ms": {name: round(seconds * 1000, 1) for name, seconds in import_report()},
+    }
+
+
+def profile_imports(module: str = "app", top: int = 25) -> Dict[str, Any]:
+    """Import module in a fresh interpreter with `-X importtime` and summarise the slowest imports."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        # Format: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, self_us, cumulative_us, name = [p.strip() for p in line.replace("import time:", "|", 1).split("|")]
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    total_us = next((cum for name, _, cum in rows if name == module), sum(s for _, s, _ in rows))
+    top_rows = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "module": module,
+        "returncode": proc.returncode,
+        "total_ms": round(total_us / 1000, 1),
+        "top": [{"module": n, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)} for n, s, c in top_rows],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cold-start import profiling")
+    parser.add_argument("--profile", action="store_true", help="Profile imports of the target module")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+    if not args.profile:
+        parser.error("nothing to do (pass --profile)")
+
+    report = profile_imports(args.module, args.top)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"Import of '{report['module']}' took {report['total_ms']} ms (exit code {report['returncode']})")
+        for row in report["top"]:
+            print(f"  {row['cumulative_ms']:9.1f} ms cumulative  {row['self_ms']:8.1f} ms self  {row['module']}")
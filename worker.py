@@ -0,0 +1,166 @@
+"""
+Pipeline Worker
+Pulls jobs from the shared job queue and runs the full pipeline (Whisper, Papago,
+ffmpeg), writing outputs into the shared artifact store. Run any number of workers,
+on this host or on others that mount the same ARTIFACT_ROOT:
+
+    JOB_QUEUE_URL=http://coordinator:8765 ARTIFACT_ROOT=/shared/artifacts python worker.py
+
+The Gradio frontend started with the same JOB_QUEUE_URL/JOB_QUEUE_DB and
+ARTIFACT_ROOT only submits jobs and tracks them.
+"""
+
+import os
+import socket
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from job_queue import DEFAULT_LEASE_SECONDS, get_job_queue, validate_payload
+
+
+class _JobReporter:
+    """Progress callback for the pipeline that heartbeats the job lease in the background."""
+
+    def __init__(self, queue, job_id: str, worker_id: str, lease_seconds: float, cancel_token=None):
+        self.queue = queue
+        self.cancel_token = cancel_token
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.progress: Optional[float] = None
+        self.desc: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{job_id}", daemon=True)
+
+    def __call__(self, value: float, desc: Optional[str] = None, **kwargs) -> None:
+        self.progress = value
+        if desc:
+            self.desc = desc
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def beat(self) -> None:
+        try:
+            if not self.queue.heartbeat(self.job_id, self.worker_id, self.lease_seconds,
+                                        self.progress, self.desc, self.result):
+                # The job was cancelled, or the lease expired and it went to another worker; stop Whisper/ffmpeg now
+                self.lost = True
+                if self.cancel_token is not None:
+                    self.cancel_token.cancel("job cancelled or worker lease lost")
+        except Exception as e:
+            print(f"⚠️ Heartbeat failed for {self.job_id}: {e}")
+
+    def _run(self) -> None:
+        # Three beats per lease period tolerate one missed heartbeat
+        while not self._stop.wait(self.lease_seconds / 3):
+            self.beat()
+            if self.lost:
+                return
+
+
+def pipeline_error(result: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Return the error message if the pipeline's final (serialized) yield carries no SRT."""
+    if not result:
+        return "Pipeline produced no output"
+    if (result.get("srt") or {}).get("value"):
+        return None
+    return result.get("korean_text") or "Pipeline produced no output"
+
+
+def process_job(queue, job: Dict[str, Any], worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS) -> None:
+    """Run one claimed job through app.run_pipeline and report results to the queue."""
+    import app
+    from artifact_store import get_store
+    from cancellation import CancelToken
+
+    store = get_store()
+    job_id = job["id"]
+    payload = job["payload"]
+    # Never trust names from the queue: they become paths in the artifact store and a download URL
+    try:
+        validate_payload(job_id, payload)
+    except ValueError as e:
+        print(f"⚠️ Rejecting job {job_id!r}: {e}")
+        queue.fail(job_id, worker_id, f"Invalid job: {e}")
+        return
+    media = store.path(job_id, payload["media"]) if payload.get("media") else None
+    token = CancelToken()
+    reporter = _JobReporter(queue, job_id, worker_id, lease_seconds, cancel_token=token)
+    reporter.start()
+    print(f"▶️ {worker_id} processing {job_id} (attempt {job['attempts']})")
+    pipeline = app.run_pipeline(media, payload.get("url"), progress=reporter, job_id=job_id, cancel_token=token)
+    try:
+        for outputs in pipeline:
+            # Publish every intermediate output (SRT first, then preview, then final video)
+            reporter.result = app.serialize_outputs(outputs, store)
+            reporter.beat()
+            if reporter.lost:
+                break
+        # A lost lease cancels the token, so the pipeline stops early; the new owner (if any) reports results
+        if reporter.lost:
+            print(f"⚠️ {job_id} was cancelled or its lease was lost; abandoning it")
+            return
+        # run_pipeline reports errors as a yield with no SRT and the message in the Korean text slot
+        error = pipeline_error(reporter.result)
+        if error:
+            print(f"❌ {worker_id} failed {job_id}: {error}")
+            queue.fail(job_id, worker_id, error)
+            return
+        queue.complete(job_id, worker_id, reporter.result)
+        print(f"✅ {worker_id} finished {job_id}")
+    except Exception as e:
+        traceback.print_exc()
+        queue.fail(job_id, worker_id, str(e))
+    finally:
+        pipeline.close()
+        reporter.stop()
+
+
+def run_worker(queue, worker_id: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+               poll_interval: float = 2.0, once: bool = False) -> None:
+    """Claim and process jobs until interrupted (or after one job with once=True)."""
+    while True:
+        try:
+            job = queue.claim(worker_id, lease_seconds)
+        except Exception as e:
+            print(f"⚠️ Could not reach job queue: {e}")
+            job = None
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        process_job(queue, job, worker_id, lease_seconds)
+        if once:
+            return
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a pipeline worker for the shared job queue")
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--lease-seconds", type=float, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--once", action="store_true", help="Exit after processing one job")
+    args = parser.parse_args()
+
+    queue = get_job_queue()
+    if queue is None:
+        parser.error("set JOB_QUEUE_URL (HTTP coordinator) or JOB_QUEUE_DB (local SQLite queue)")
+
+    import app
+    from warmup import start_warmup
+
+    # Load Whisper before the first claim so the first job does not pay for it
+    if app.USE_WHISPER:
+        start_warmup(app.WHISPER_MODEL).join()
+    print(f"👷 Worker {args.worker_id} ready")
+    run_worker(queue, args.worker_id, args.lease_seconds, args.poll_interval, args.once)